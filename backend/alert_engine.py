@@ -0,0 +1,64 @@
+# backend/alert_engine.py
+import datetime
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from backend.models import ZoneAlertState, AlertEvent
+from backend.risk_rules import classify_snapshot, NORMAL
+
+def _event_kind(old_severity, new_severity):
+    if old_severity == 0:
+        return "opened"
+    if new_severity == 0:
+        return "closed"
+    return "escalated" if new_severity > old_severity else "downgraded"
+
+def process_alerts(db: Session, snapshot):
+    """
+    Runs after every ingestion commit.
+    Compares the new classification with each zone's stored state (with hysteresis)
+    and persists ONLY the transitions. Returns the list of new AlertEvents.
+    """
+    # Already hysteresis-adjusted against the states loaded with the snapshot (same statuses the channels show)
+    final = classify_snapshot(snapshot)
+    states = {s.city: s for s in db.query(ZoneAlertState).all()}
+
+    previous = pd.Series({city: s.status for city, s in states.items()}, dtype=object)
+
+    prev_status = previous.reindex(final.index).fillna(NORMAL["status"])
+    changed = final[final["status"].to_numpy() != prev_status.to_numpy()]
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    events = []
+    for row in changed.itertuples():
+        state = states.get(row.city)
+        old_status = state.status if state else NORMAL["status"]
+        old_severity = state.severity if state else 0
+
+        if state is None:
+            state = ZoneAlertState(city=row.city)
+            db.add(state)
+        state.status, state.label, state.severity, state.since = row.status, row.label, int(row.severity), now
+
+        event = AlertEvent(
+            city=row.city, event=_event_kind(old_severity, int(row.severity)),
+            status=row.status, previous_status=old_status, label=row.label, severity=int(row.severity),
+            rainfall_1h=row.rainfall_1h, temperature=row.temperature, timestamp=now,
+        )
+        db.add(event)
+        events.append(event)
+        print(f"   🔔 {row.city}: {old_status} -> {row.status} ({event.event})")
+
+    db.commit()
+    return events
+
+def open_alerts_query(min_severity=1):
+    """The small set of zones currently in an alert state, most severe first."""
+    return (
+        select(ZoneAlertState)
+        .where(ZoneAlertState.severity >= min_severity)
+        .order_by(ZoneAlertState.severity.desc(), ZoneAlertState.since)
+    )
+
+def recent_events_query(limit=50):
+    return select(AlertEvent).order_by(AlertEvent.timestamp.desc()).limit(limit)
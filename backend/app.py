@@ -1,34 +1,96 @@
 # backend/app.py
-from fastapi import FastAPI, Form, Request, Response
+from fastapi import FastAPI, Form, Request, Response, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
 from contextlib import asynccontextmanager
 from apscheduler.schedulers.background import BackgroundScheduler
-from .database import engine, Base, SessionLocal
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import engine, Base, SessionLocal, get_db, get_async_db
 
 # Uses the weather service (26 zones)
-from .weather_service import fetch_live_weather 
+from .weather_service import API_KEY
+from .polling import adaptive_poller, POLL_TICK_MINUTES
 from .ussd_service import handle_ussd_session 
 from .whatsapp_service import handle_whatsapp_message
+from .ingest import rebuild_current_conditions
+from .partitions import create_partitions
+from .rollups import run_rollups, apply_retention, get_daily_trend
+from .history_store import export_from_postgres, HISTORY_EXPORT
+from .spatial import zone_index, ensure_spatial_index
+from .zone_registry import ensure_zone_columns
+from .alert_engine import open_alerts_query, recent_events_query
+from .conditions_cache import latest_conditions
+from .vision import analysis_cache
+from .model_registry import model_registry
 
 # Create Tables
 Base.metadata.create_all(bind=engine)
 
+with SessionLocal() as _db:
+    # weather_logs is partitioned by month, so inserts need this month's partition to exist
+    create_partitions(_db)
+    ensure_spatial_index(_db)
+    # Zone coordinates come from their polygons, computed once and stored
+    ensure_zone_columns(_db)
+    # Seed the "latest reading per zone" table from history on first boot
+    rebuild_current_conditions(_db)
+
 # --- THE AUTOMATION ENGINE ---
 def scheduled_weather_task():
-    """Runs automatically to update weather data."""
+    """Full scan on startup, charged to the same API budget as the adaptive ticks."""
+    if not API_KEY:
+        print("❌ Error: OPENWEATHER_API_KEY not found in .env")
+        return
     print("⏰ AUTOMATION: Starting scheduled weather scan...")
     try:
-        fetch_live_weather()
+        adaptive_poller.full_scan()
     except Exception as e:
         print(f"❌ AUTOMATION ERROR: {e}")
 
+def scheduled_adaptive_task():
+    """Polls only the zones that are due (risk/rain-aware cadence, rate limited)."""
+    if not API_KEY:
+        return
+    try:
+        adaptive_poller.tick()
+    except Exception as e:
+        print(f"❌ ADAPTIVE POLL ERROR: {e}")
+
+def scheduled_rollup_task():
+    """Folds new raw readings into the hourly/daily rollups and applies retention."""
+    try:
+        with SessionLocal() as db:
+            until = run_rollups(db, retention=False)
+            # Archive to Parquet after the rollups (complete days only) but before retention drops raw rows
+            if HISTORY_EXPORT:
+                export_from_postgres(db)
+            if until is not None:
+                apply_retention(db, until)
+    except Exception as e:
+        print(f"❌ ROLLUP ERROR: {e}")
+
+def scheduled_partition_task():
+    """Keeps a few months of weather_logs partitions ready ahead of time."""
+    try:
+        with SessionLocal() as db:
+            create_partitions(db)
+    except Exception as e:
+        print(f"❌ PARTITION ERROR: {e}")
+
 # Start the scheduler when the app starts
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     scheduler = BackgroundScheduler()
-    # Run immediately on startup
+    # Run a full scan immediately on startup
     scheduler.add_job(scheduled_weather_task, 'date', run_date=None) 
-    # Then run every 1 hour
-    scheduler.add_job(scheduled_weather_task, 'interval', minutes=60)
+    # Then poll each zone on its own cadence (5 min for Critical + raining, hours for dry/low risk)
+    # (a tick that is still running is never doubled up; missed ticks collapse into one)
+    scheduler.add_job(scheduled_adaptive_task, 'interval', minutes=POLL_TICK_MINUTES, max_instances=1, coalesce=True)
+    # Downsample into rollup tables (runs between scans)
+    scheduler.add_job(scheduled_rollup_task, 'interval', minutes=60)
+    # Partition housekeeping once a day
+    scheduler.add_job(scheduled_partition_task, 'interval', hours=24)
     scheduler.start()
     print("✅ System Online: Weather Scheduler Started.")
     yield
@@ -41,34 +103,115 @@ app = FastAPI(title="GeoGuard Kenya", lifespan=lifespan)
 def home():
     return {"status": "GeoGuard National Monitor Online", "mode": "Automated"}
 
+# --- ZONE LOOKUP (Point -> Risk Zone) ---
+class PointBatch(BaseModel):
+    points: list[tuple[float, float]]  # [(lat, lon), ...]
+
+@app.get("/zones/lookup")
+def lookup_zone(lat: float, lon: float):
+    """Returns the risk zone(s) containing a point, or the nearest one."""
+    return {"lat": lat, "lon": lon, "zones": zone_index.find_zones(lat, lon)}
+
+@app.post("/zones/lookup")
+def lookup_zones_batch(batch: PointBatch):
+    """Same as above for many points in one call (e.g. a batch of GPS pins)."""
+    results = zone_index.find_zones_batch(batch.points)
+    return {"results": [{"lat": lat, "lon": lon, "zones": zones} for (lat, lon), zones in zip(batch.points, results)]}
+
+# --- ALERTS (state changes only, computed at ingestion time) ---
+@app.get("/alerts")
+async def open_alerts(db: AsyncSession = Depends(get_async_db)):
+    """Zones currently in an alert state plus the latest transitions."""
+    open_now = (await db.scalars(open_alerts_query())).all()
+    recent = (await db.scalars(recent_events_query())).all()
+    return {
+        "open": [
+            {"city": a.city, "status": a.status, "label": a.label, "severity": a.severity, "since": a.since}
+            for a in open_now
+        ],
+        "recent_events": [
+            {"city": e.city, "event": e.event, "status": e.status, "previous_status": e.previous_status,
+             "severity": e.severity, "timestamp": e.timestamp}
+            for e in recent
+        ],
+    }
+
+# --- LONG-RANGE TREND (daily rollup table, never a scan of raw weather_logs) ---
+@app.get("/trend")
+def daily_trend(zone: str, days: int = Query(default=90, ge=1, le=3650), db: Session = Depends(get_db)):
+    """One row per day for a zone: rainfall total and peak hour, temperature range, humidity."""
+    rows = get_daily_trend(db, zone, days)
+    return {
+        "zone": zone,
+        "days": days,
+        "trend": [
+            {"day": r.day.isoformat(), "rain_total": r.rain_total, "rain_max_1h": r.rain_max_1h,
+             "temp_min": r.temp_min, "temp_max": r.temp_max, "temp_mean": r.temp_mean, "humidity_mean": r.humidity_mean}
+            for r in rows
+        ],
+    }
+
+# --- SEASONAL FORECAST (precomputed tables, no model at request time) ---
+@app.get("/forecast")
+def seasonal_forecast(days: int = Query(default=90, ge=1, le=366), zone: str | None = None):
+    """Daily rainfall forecast with the trees' 10th-90th percentile band (per zone if it has its own model)."""
+    if zone and zone not in model_registry.zones():
+        raise HTTPException(status_code=404, detail=f"No seasonal model for zone '{zone}'.")
+    result = model_registry.forecast(zone, days)
+    if result is None:
+        raise HTTPException(status_code=503, detail="Forecast table missing. Run scripts.train_model.")
+    quantile_keys = [k for k in result if k[0] == "p" and k[1:].isdigit()]
+    return {
+        "days": days,
+        "zone": zone or "National",
+        "model_version": model_registry.version if zone else None,
+        "forecast": [
+            {"date": d.isoformat(), "rainfall_mm": round(float(result["predicted_rain"][i]), 2),
+             **{k: round(float(result[k][i]), 2) for k in quantile_keys}}
+            for i, d in enumerate(result["date"])
+        ],
+    }
+
+@app.get("/models/stats")
+def model_stats():
+    """Live registry version and how many zone models/tables are resident."""
+    return model_registry.stats()
+
+# --- VISION CACHE STATS ---
+@app.get("/vision/stats")
+def vision_stats():
+    """Hit-rate counters for the photo analysis cache."""
+    return analysis_cache.stats()
+
 # --- USSD ENDPOINT (Africa's Talking) ---
 @app.post("/ussd")
 async def ussd_callback(
     text: str = Form(default=""),
     sessionId: str = Form(default=""),
     serviceCode: str = Form(default=""),
-    phoneNumber: str = Form(default="")
+    phoneNumber: str = Form(default=""),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Receives the POST request from Africa's Talking when a farmer dials *384*...
     """
-    db = SessionLocal()
-    try:
-        # Pass the text input to our logic engine
-        response_text = handle_ussd_session(text, db)
-        
-        # Return raw text (CON/END), NOT JSON
-        return Response(content=response_text, media_type="text/plain")
-        
-    finally:
-        db.close()
+    # Latest readings (memory, async DB read only when the cache is stale)
+    snapshot = await latest_conditions.asnapshot(db)
+
+    # Pass the text input to our logic engine in the threadpool:
+    # the menu and zone lookups go through zone_registry, which reloads from the DB (sync) once its TTL is up
+    response_text = await run_in_threadpool(handle_ussd_session, text, snapshot)
+    
+    # Return raw text (CON/END), NOT JSON
+    return Response(content=response_text, media_type="text/plain")
 
 # --- NEW WHATSAPP ENDPOINT (Twilio) ---
 @app.post("/whatsapp")
-async def whatsapp_reply(request: Request):
+async def whatsapp_reply(request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     Receives messages from Twilio (WhatsApp).
     Handles both Text (Menu) and Media (Images).
+    Photos are only acknowledged here; the verdict is sent later as an outbound message.
     """
     # Parse Twilio's Form Data
     form_data = await request.form()
@@ -76,9 +219,19 @@ async def whatsapp_reply(request: Request):
     body = form_data.get("Body", "")       # The text message
     media_url = form_data.get("MediaUrl0") # The image (if any)
     sender = form_data.get("From")         # The phone number
+    lat = form_data.get("Latitude")        # Shared location pin (if any)
+    lon = form_data.get("Longitude")
+    try:
+        location = (float(lat), float(lon)) if lat and lon else None
+    except ValueError:
+        location = None   # Malformed pin: answer as if no location was shared
+
+    # Warm the conditions cache on the event loop so the worker thread never opens a sync session
+    await latest_conditions.asnapshot(db)
     
     # Process logic via the service
-    response_xml = handle_whatsapp_message(body, media_url, sender)
+    # (sync code -> threadpool, so a slow lookup never blocks other users)
+    response_xml = await run_in_threadpool(handle_whatsapp_message, body, media_url, sender, location)
     
     # Return XML (Twilio language)
     return Response(content=response_xml, media_type="application/xml")
\ No newline at end of file
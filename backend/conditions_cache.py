@@ -0,0 +1,100 @@
+# backend/conditions_cache.py
+import os
+import time
+import threading
+from collections import namedtuple
+from sqlalchemy import select
+from backend.database import SessionLocal
+from backend.models import CurrentCondition, ZoneAlertState
+
+# Data only changes when a scan commits, so this is just a safety net
+CONDITIONS_CACHE_TTL = float(os.getenv("CONDITIONS_CACHE_TTL", "300"))
+
+# Plain, detached record (same attribute names as WeatherLog, so callers don't care)
+Conditions = namedtuple("Conditions", ["city", "temperature", "rainfall_1h", "humidity", "lat", "lon", "timestamp"])
+
+class ConditionsSnapshot:
+    """An immutable copy of current_conditions (and the persisted alert state per zone) taken at one point in time."""
+
+    def __init__(self, records, alert_states=None):
+        self.records = records
+        # {city: status} from zone_alert_states, the "previous" status hysteresis is applied against
+        self.alert_states = alert_states or {}
+        # Newest reading in the snapshot; changes whenever an ingestion run commits
+        self.version = max((r.timestamp for r in records.values() if r.timestamp), default=None)
+        self.loaded_at = time.monotonic()
+        # Filled in once by backend.risk_rules.classify_snapshot
+        self.statuses = None
+
+    def get(self, city):
+        return self.records.get(city)
+
+class LatestConditionsCache:
+    """
+    Read-through, process-wide cache of the latest reading per zone.
+    USSD/WhatsApp read from memory; the ingestion job calls refresh() after it commits.
+    """
+
+    def __init__(self, ttl=CONDITIONS_CACHE_TTL):
+        self.ttl = ttl
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    # Same column order as the Conditions tuple
+    QUERY = select(*[getattr(CurrentCondition, f) for f in Conditions._fields])
+    STATES_QUERY = select(ZoneAlertState.city, ZoneAlertState.status)
+
+    @staticmethod
+    def _build(rows, state_rows):
+        return ConditionsSnapshot({r.city: Conditions(*r) for r in rows}, {r.city: r.status for r in state_rows})
+
+    def _load(self, db=None):
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            return self._build(db.execute(self.QUERY).all(), db.execute(self.STATES_QUERY).all())
+        finally:
+            if own_session:
+                db.close()
+
+    def _is_fresh(self, snap):
+        return snap is not None and (time.monotonic() - snap.loaded_at) < self.ttl
+
+    def snapshot(self, db=None):
+        """Returns the cached snapshot, loading it (once, even under a burst) if missing or expired."""
+        snap = self._snapshot
+        if self._is_fresh(snap):
+            return snap
+        with self._lock:
+            if not self._is_fresh(self._snapshot):
+                self._snapshot = self._load(db)
+            return self._snapshot
+
+    async def asnapshot(self, db):
+        """Async twin of snapshot() for endpoints that hold an AsyncSession."""
+        snap = self._snapshot
+        if self._is_fresh(snap):
+            return snap
+        rows = (await db.execute(self.QUERY)).all()
+        state_rows = (await db.execute(self.STATES_QUERY)).all()
+        snap = self._build(rows, state_rows)
+        with self._lock:
+            self._snapshot = snap
+        return snap
+
+    def get(self, city, db=None):
+        return self.snapshot(db).get(city)
+
+    def refresh(self, db=None):
+        """Reloads immediately (called by the ingestion job after commit)."""
+        snap = self._load(db)
+        with self._lock:
+            self._snapshot = snap
+        return snap
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+# Shared instance for the whole process
+latest_conditions = LatestConditionsCache()
@@ -0,0 +1,97 @@
+# backend/forecast.py
+import os
+import datetime
+import threading
+import numpy as np
+
+# Written by scripts/train_model.py next to seasonal_model.pkl
+FORECAST_TABLE_PATH = os.getenv(
+    "FORECAST_TABLE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "seasonal_forecast.npz"),
+)
+FORECAST_QUANTILES = (0.1, 0.5, 0.9)
+DAYS_IN_TABLE = 366   # Leap years included
+
+def build_forecast_table(model, quantiles=FORECAST_QUANTILES):
+    """
+    The model only sees day_of_year, so every possible answer fits in 366 rows.
+    Mean = the forest's own prediction; quantiles come from the spread of the individual trees.
+    model: a RandomForestRegressor or an exported backend.forest.Forest.
+    """
+    days = np.arange(1, DAYS_IN_TABLE + 1, dtype=np.float32).reshape(-1, 1)
+    if hasattr(model, "predict_per_tree"):
+        per_tree = model.predict_per_tree(days).T   # (trees, 366)
+    else:
+        per_tree = np.stack([tree.predict(days) for tree in model.estimators_])   # (trees, 366)
+    return {
+        "day_of_year": days.ravel().astype(np.int16),
+        "mean": per_tree.mean(axis=0).astype(np.float32),
+        "quantile_levels": np.asarray(quantiles, dtype=np.float32),
+        "quantiles": np.quantile(per_tree, quantiles, axis=0).astype(np.float32),   # (q, 366)
+    }
+
+def save_forecast_table(model, path=FORECAST_TABLE_PATH):
+    table = build_forecast_table(model)
+    np.savez(path, **table)
+    return path
+
+class ForecastTable:
+    """
+    In-memory copy of the precomputed table; reloads itself when training writes a new file.
+    Without the file, model_loader (e.g. the memory-mapped Forest) is used to build the table in memory.
+    """
+
+    def __init__(self, path=FORECAST_TABLE_PATH, model_loader=None):
+        self.path = path
+        self.model_loader = model_loader
+        self._lock = threading.Lock()
+        self._data = None
+        self._mtime = None
+        self._model = None
+
+    def _from_model(self):
+        model = self.model_loader() if self.model_loader else None
+        if model is None:
+            return None
+        with self._lock:
+            # Rebuilt only when the loader hands back a different (retrained) model
+            if self._data is None or self._mtime is not None or model is not self._model:
+                self._data = build_forecast_table(model)
+                self._mtime, self._model = None, model
+            return self._data
+
+    def _current(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return self._from_model()
+        with self._lock:
+            if self._data is None or mtime != self._mtime:
+                with np.load(self.path) as npz:
+                    self._data = {k: npz[k] for k in npz.files}
+                self._mtime = mtime
+            return self._data
+
+    @property
+    def available(self):
+        return self._current() is not None
+
+    def forecast(self, days, start=None):
+        """
+        Forecast for `days` days from `start` (default today) by slicing the table.
+        Returns {"date": [...], "predicted_rain": array, "p10": array, ...} or None if there is no table.
+        """
+        data = self._current()
+        if data is None:
+            return None
+        start = start or datetime.date.today()
+        dates = [start + datetime.timedelta(days=i) for i in range(days)]
+        idx = np.fromiter((d.timetuple().tm_yday - 1 for d in dates), dtype=np.int16, count=days)
+
+        result = {"date": dates, "predicted_rain": data["mean"][idx]}
+        for level, row in zip(data["quantile_levels"], data["quantiles"]):
+            result[f"p{round(float(level) * 100)}"] = row[idx]
+        return result
+
+# Shared instance for the whole process
+forecast_table = ForecastTable()
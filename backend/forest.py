@@ -0,0 +1,91 @@
+# backend/forest.py
+import os
+import json
+import shutil
+import numpy as np
+
+# Flat, memory-mappable copy of a trained RandomForestRegressor.
+# <name>.forest/ holds one .npy per node attribute; every tree's nodes are laid end to end.
+FOREST_ARRAYS = ("left", "right", "feature", "threshold", "value", "roots")
+
+def export_forest(model, path):
+    """
+    Flattens model.estimators_ into contiguous node arrays (child indices made global, -1 = leaf)
+    and writes them next to a small meta.json. Only needs scikit-learn at export time.
+    """
+    left, right, feature, threshold, value, roots = [], [], [], [], [], []
+    offset = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        is_leaf = tree.children_left == -1
+        roots.append(offset)
+        left.append(np.where(is_leaf, -1, tree.children_left + offset))
+        right.append(np.where(is_leaf, -1, tree.children_right + offset))
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(tree.threshold)
+        value.append(tree.value[:, 0, 0])
+        offset += tree.node_count
+
+    arrays = {
+        "left": np.concatenate(left).astype(np.int32),
+        "right": np.concatenate(right).astype(np.int32),
+        "feature": np.concatenate(feature).astype(np.int32),
+        "threshold": np.concatenate(threshold).astype(np.float64),
+        "value": np.concatenate(value).astype(np.float64),
+        "roots": np.asarray(roots, dtype=np.int32),
+    }
+
+    # Write to a temp dir and swap in, so a reader never maps a half-written forest
+    tmp = path + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name, arr in arrays.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), arr)
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({"n_trees": len(roots), "n_nodes": offset, "n_features": int(model.n_features_in_)}, f)
+    # Move the old copy aside (a rename, not a slow rmtree) so `path` is only missing between two renames;
+    # processes that already mapped it keep reading the moved files until they reload
+    old = path + ".old"
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old)
+    os.replace(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+    return path
+
+class Forest:
+    """Pure-NumPy batch predictor over the exported arrays (no scikit-learn import needed)."""
+
+    def __init__(self, arrays, meta):
+        for name in FOREST_ARRAYS:
+            setattr(self, name, arrays[name])
+        self.n_trees = meta["n_trees"]
+        self.n_features = meta["n_features"]
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """mmap=True: pages are shared between every process that loads the same file."""
+        mode = "r" if mmap else None
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode) for name in FOREST_ARRAYS}
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        return cls(arrays, meta)
+
+    def predict_per_tree(self, X):
+        """(n_samples, n_trees) leaf values. All samples and trees descend one level per step."""
+        # Same comparison as scikit-learn: features as float32, thresholds as float64
+        X = np.asarray(X, dtype=np.float32).reshape(-1, self.n_features).astype(np.float64)
+        rows = np.arange(X.shape[0])[:, None]
+        node = np.broadcast_to(self.roots, (X.shape[0], self.n_trees)).copy()
+
+        active = self.left[node] != -1
+        while active.any():
+            n = node[active]
+            go_left = X[np.broadcast_to(rows, node.shape)[active], self.feature[n]] <= self.threshold[n]
+            node[active] = np.where(go_left, self.left[n], self.right[n])
+            active = self.left[node] != -1
+        return self.value[node]
+
+    def predict(self, X):
+        """Forest prediction (mean over trees), same as RandomForestRegressor.predict."""
+        return self.predict_per_tree(X).mean(axis=1)
@@ -0,0 +1,283 @@
+# backend/history_store.py
+import os
+import json
+import datetime
+from urllib.parse import quote, unquote
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Synthetic series (scripts/generate_history.py), what training reads by default
+HISTORY_DIR = os.getenv("HISTORY_DIR", os.path.join(BASE_DIR, "data", "processed", "history"))
+# Real readings exported from Postgres (see export_from_postgres)
+OBSERVED_DIR = os.getenv("OBSERVED_DIR", os.path.join(BASE_DIR, "data", "processed", "observed"))
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "100000"))
+# Raw rows younger than this are left for the next run (an ingestion run may still be committing them)
+EXPORT_LAG_MINUTES = int(os.getenv("EXPORT_LAG_MINUTES", "10"))
+# A zone's incremental export files are merged into one once it has more than this (24 = a day of hourly runs)
+EXPORT_COMPACT_FILES = int(os.getenv("EXPORT_COMPACT_FILES", "24"))
+# Export new readings to OBSERVED_DIR on every rollup run (off by default: needs a persistent disk)
+HISTORY_EXPORT = os.getenv("HISTORY_EXPORT", "false").lower() == "true"
+
+# Zone name of the single national series
+NATIONAL_ZONE = "National"
+
+# --- SCHEMAS (zone is the hive partition key: zone=<name>/; year stays a column for row-group pruning) ---
+# One directory per zone, so a zone's whole history lands in a single file per write (no 365-row files)
+PARTITIONING = ds.partitioning(pa.schema([("zone", pa.string())]), flavor="hive")
+
+DAILY_SCHEMA = pa.schema([
+    ("zone", pa.string()), ("year", pa.int16()),
+    ("date", pa.date32()), ("day_of_year", pa.int16()),
+    ("rainfall_mm", pa.float32()), ("temperature_c", pa.float32()),
+])
+
+RAW_SCHEMA = pa.schema([
+    ("zone", pa.string()), ("year", pa.int16()),
+    ("timestamp", pa.timestamp("us", tz="UTC")),
+    ("temperature", pa.float32()), ("rainfall_1h", pa.float32()), ("humidity", pa.float32()),
+    ("lat", pa.float64()), ("lon", pa.float64()),
+])
+
+class HistoryStore:
+    """
+    Parquet dataset partitioned by zone.
+    Only the requested columns are read; zone filters skip whole directories before any
+    file is opened, and year/date predicates are pushed down to Parquet row-group statistics.
+    """
+
+    def __init__(self, root, schema=DAILY_SCHEMA, time_column="date"):
+        self.root = root
+        self.schema = schema
+        self.time_column = time_column
+
+    @property
+    def exists(self):
+        return os.path.isdir(self.root) and any(d.startswith("zone=") for d in os.listdir(self.root))
+
+    def zone_path(self, zone):
+        """zone=<name>/ directory, escaped the same way pyarrow writes hive partitions."""
+        return os.path.join(self.root, "zone=" + quote(zone, safe=""))
+
+    def dataset(self, zones=None):
+        """
+        The whole store, or only the directories of `zones` (the rest of the tree is never listed).
+        None if none of the zones has any data.
+        """
+        if zones is None:
+            return ds.dataset(self.root, format="parquet", partitioning=PARTITIONING, schema=self.schema)
+        parts = [
+            ds.dataset(path, format="parquet", partitioning=PARTITIONING, partition_base_dir=self.root, schema=self.schema)
+            for path in map(self.zone_path, zones) if os.path.isdir(path)
+        ]
+        return ds.dataset(parts) if parts else None
+
+    def zones(self):
+        """Zone names straight from the directory layout (no file is opened)."""
+        if not self.exists:
+            return []
+        return sorted(unquote(d.split("=", 1)[1]) for d in os.listdir(self.root) if d.startswith("zone="))
+
+    def filter(self, zones=None, start=None, end=None):
+        """Expression for a zone list and an inclusive [start, end] range (dates or datetimes)."""
+        time_type = self.schema.field(self.time_column).type
+        parts = []
+        if zones is not None:
+            parts.append(ds.field("zone").isin(list(zones)))
+        if start is not None:
+            parts.append(ds.field("year") >= start.year)
+            parts.append(ds.field(self.time_column) >= _scalar(start, time_type))
+        if end is not None:
+            parts.append(ds.field("year") <= end.year)
+            parts.append(ds.field(self.time_column) <= _scalar(end, time_type))
+
+        expr = None
+        for part in parts:
+            expr = part if expr is None else expr & part
+        return expr
+
+    def read(self, columns=None, zones=None, start=None, end=None):
+        """DataFrame with just `columns` (default: all) for the given zones and date range."""
+        dataset = self.dataset(zones) if zones is not None else (self.dataset() if self.exists else None)
+        if dataset is None:
+            return self.schema.empty_table().select(columns or self.schema.names).to_pandas()
+        return dataset.to_table(columns=columns, filter=self.filter(zones, start, end)).to_pandas()
+
+    def write(self, data, basename, replace=False):
+        """
+        Appends a DataFrame/Table that has zone and year columns.
+        basename must be unique per write (e.g. 'export-<timestamp>'), so appends never replace earlier files.
+        replace=True instead deletes whatever the written zones held before (full regeneration, no stale parts).
+        """
+        table = data if isinstance(data, pa.Table) else pa.Table.from_pandas(data, preserve_index=False)
+        table = table.select(self.schema.names).cast(self.schema)
+        pq.write_to_dataset(
+            table, self.root, partitioning=PARTITIONING,
+            basename_template=f"{basename}-{{i}}.parquet",
+            existing_data_behavior="delete_matching" if replace else "overwrite_or_ignore",
+        )
+        return table.num_rows
+
+    def compact(self, zones, max_files=EXPORT_COMPACT_FILES, prefix="export-"):
+        """
+        Merges a zone's small incremental files (basename starting with `prefix`) into one sorted file
+        once there are more than max_files. The merged file stays hidden until the small ones are removed,
+        so a concurrent read may briefly miss those rows but never sees them twice.
+        Returns the number of zones compacted.
+        """
+        compacted = 0
+        for zone in zones:
+            path = self.zone_path(zone)
+            parts = sorted(f for f in os.listdir(path) if f.startswith(prefix)) if os.path.isdir(path) else []
+            if len(parts) <= max_files:
+                continue
+            files = [os.path.join(path, f) for f in parts]
+            table = ds.dataset(files, format="parquet").to_table().sort_by(self.time_column)
+            # "_" prefix: ignored by dataset discovery until it is renamed
+            stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+            tmp = os.path.join(path, f"_compact-{stamp}.tmp")
+            pq.write_table(table, tmp)
+            for f in files:
+                os.remove(f)
+            os.replace(tmp, os.path.join(path, f"compact-{stamp}-0.parquet"))
+            compacted += 1
+        return compacted
+
+def _scalar(value, arrow_type):
+    if pa.types.is_date(arrow_type) and isinstance(value, datetime.datetime):
+        value = value.date()
+    elif pa.types.is_timestamp(arrow_type) and not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time(), datetime.timezone.utc)
+    return pa.scalar(value, arrow_type)
+
+# Shared stores
+history_store = HistoryStore(HISTORY_DIR)
+observed_daily = HistoryStore(os.path.join(OBSERVED_DIR, "daily"))
+observed_raw = HistoryStore(os.path.join(OBSERVED_DIR, "raw"), RAW_SCHEMA, time_column="timestamp")
+
+# =========================================================
+# INCREMENTAL EXPORT FROM POSTGRES
+# =========================================================
+# Watermarks live next to the exported files: delete the directory and the next export starts over
+WATERMARK_FILE = os.path.join(OBSERVED_DIR, "_watermarks.json")
+
+def _load_watermarks():
+    try:
+        with open(WATERMARK_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_watermark(name, value):
+    marks = _load_watermarks()
+    marks[name] = value.isoformat()
+    os.makedirs(os.path.dirname(WATERMARK_FILE), exist_ok=True)
+    tmp = WATERMARK_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(marks, f, indent=2)
+    os.replace(tmp, WATERMARK_FILE)
+
+def _write_raw(rows, basename):
+    timestamps = [r.timestamp for r in rows]
+    table = pa.table({
+        "zone": [r.city for r in rows],
+        "year": [t.year for t in timestamps],
+        "timestamp": timestamps,
+        "temperature": [r.temperature for r in rows],
+        "rainfall_1h": [r.rainfall_1h for r in rows],
+        "humidity": [r.humidity for r in rows],
+        "lat": [r.lat for r in rows],
+        "lon": [r.lon for r in rows],
+    })
+    return observed_raw.write(table, basename)
+
+def export_raw_logs(db, batch_size=EXPORT_BATCH_ROWS, lag_minutes=EXPORT_LAG_MINUTES):
+    """
+    Appends weather_logs rows newer than the last export and older than lag_minutes, streamed in batches
+    (server-side cursor, flat memory). Run it before rollups.apply_retention drops old raw rows.
+    """
+    # Imported here so reading the store (training, notebooks) never needs a database configured
+    from sqlalchemy import select
+    from backend.models import WeatherLog
+
+    since = _load_watermarks().get("raw")
+    since = datetime.datetime.fromisoformat(since) if since else None
+    until = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(minutes=lag_minutes)
+    if since is not None and since >= until:
+        return 0
+    query = select(
+        WeatherLog.city, WeatherLog.timestamp, WeatherLog.temperature,
+        WeatherLog.rainfall_1h, WeatherLog.humidity, WeatherLog.lat, WeatherLog.lon,
+    ).where(WeatherLog.timestamp <= until).order_by(WeatherLog.timestamp)
+    if since is not None:
+        query = query.where(WeatherLog.timestamp > since)
+
+    run = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    total, held, zones = 0, [], set()
+    result = db.execute(query.execution_options(yield_per=batch_size))
+    for n, rows in enumerate(result.partitions()):
+        rows = held + list(rows)
+        # Rows sharing the batch's last timestamp may continue in the next batch: carry them over,
+        # so the watermark only ever lands on a timestamp whose rows are all on disk
+        cut = len(rows)
+        while cut and rows[cut - 1].timestamp == rows[-1].timestamp:
+            cut -= 1
+        rows, held = rows[:cut], rows[cut:]
+        if rows:
+            total += _write_raw(rows, f"export-{run}-{n}")
+            zones.update(r.city for r in rows)
+            _save_watermark("raw", rows[-1].timestamp)
+    if held:
+        total += _write_raw(held, f"export-{run}-last")
+        zones.update(r.city for r in held)
+    # Everything up to `until` is on disk now, even if this run found nothing
+    _save_watermark("raw", until)
+
+    # Hourly runs leave one small file per zone each time: merge them
+    observed_raw.compact(zones)
+    return total
+
+def export_daily_rollups(db):
+    """
+    Appends completed days from weather_rollup_daily: only days before the one the rollup watermark sits in,
+    so a day is never exported before run_rollups has folded in all of it. Run it after run_rollups.
+    """
+    from sqlalchemy import select, cast, Date
+    from backend.models import WeatherDailyRollup, RollupWatermark
+    from backend.rollups import WATERMARK
+
+    since = _load_watermarks().get("daily")
+    # Same CAST(... AS date) as rollups.DAILY_SQL, so both agree on where a day ends (no watermark = nothing)
+    rolled_up_day = (
+        select(cast(RollupWatermark.last_timestamp, Date)).where(RollupWatermark.name == WATERMARK).scalar_subquery()
+    )
+    query = select(
+        WeatherDailyRollup.city, WeatherDailyRollup.day, WeatherDailyRollup.rain_total, WeatherDailyRollup.temp_mean,
+    ).where(WeatherDailyRollup.day < rolled_up_day).order_by(WeatherDailyRollup.day)
+    if since:
+        query = query.where(WeatherDailyRollup.day > datetime.date.fromisoformat(since))
+
+    rows = db.execute(query).all()
+    if not rows:
+        return 0
+    table = pa.table({
+        "zone": [r.city for r in rows],
+        "year": [r.day.year for r in rows],
+        "date": [r.day for r in rows],
+        "day_of_year": [r.day.timetuple().tm_yday for r in rows],
+        "rainfall_mm": [r.rain_total for r in rows],
+        "temperature_c": [r.temp_mean for r in rows],
+    })
+    written = observed_daily.write(table, f"export-{rows[-1].day.isoformat()}")
+    _save_watermark("daily", rows[-1].day)
+    observed_daily.compact({r.city for r in rows})
+    return written
+
+def export_from_postgres(db):
+    """
+    Incremental export of raw readings and daily rollups. Returns rows written per dataset.
+    Run it after rollups.run_rollups and before rollups.apply_retention.
+    """
+    return {"raw": export_raw_logs(db), "daily": export_daily_rollups(db)}
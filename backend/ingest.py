@@ -0,0 +1,103 @@
+# backend/ingest.py
+import io
+import os
+import csv
+import time
+import datetime
+from sqlalchemy import insert, select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from backend.models import WeatherLog, CurrentCondition
+
+# --- BULK WRITE SETTINGS ---
+# Rows per INSERT statement (Postgres caps bind params at 65k, 7 cols * 5000 is safe)
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "5000"))
+# "insert" = multi-row INSERT ... VALUES, "copy" = PostgreSQL COPY FROM STDIN
+INGEST_METHOD = os.getenv("INGEST_METHOD", "insert")
+
+COLUMNS = ["city", "temperature", "rainfall_1h", "humidity", "lat", "lon", "timestamp"]
+
+def _copy_rows(db: Session, rows):
+    """Streams rows into weather_logs with a single COPY (psycopg2 only)."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow([row[c] for c in COLUMNS])
+    buf.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    cursor.copy_expert(
+        f"COPY {WeatherLog.__tablename__} ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+        buf,
+    )
+
+def upsert_current_conditions(db: Session, rows):
+    """
+    Keeps current_conditions at exactly one row per zone.
+    Runs inside the caller's transaction, so it commits atomically with the weather_logs insert.
+    """
+    # ON CONFLICT can't touch the same row twice in one statement, so keep only the newest per city
+    latest = {}
+    for row in rows:
+        prev = latest.get(row["city"])
+        if prev is None or row["timestamp"] >= prev["timestamp"]:
+            latest[row["city"]] = row
+    if not latest:
+        return
+
+    stmt = pg_insert(CurrentCondition).values(list(latest.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CurrentCondition.city],
+        set_={c: stmt.excluded[c] for c in COLUMNS if c != "city"},
+        # Never let a late/out-of-order batch overwrite a newer reading
+        where=CurrentCondition.timestamp <= stmt.excluded.timestamp,
+    )
+    db.execute(stmt)
+
+def rebuild_current_conditions(db: Session):
+    """One-off backfill of current_conditions from weather_logs (only runs if the table is empty)."""
+    if db.scalar(select(func.count()).select_from(CurrentCondition)):
+        return
+    latest = (
+        select(*[getattr(WeatherLog, c) for c in COLUMNS])
+        .order_by(WeatherLog.city, WeatherLog.timestamp.desc())
+        .distinct(WeatherLog.city)
+    )
+    db.execute(insert(CurrentCondition).from_select(COLUMNS, latest))
+    db.commit()
+    print("✅ current_conditions backfilled from weather_logs.")
+
+def bulk_insert_weather_logs(db: Session, observations, method=None, batch_size=None):
+    """
+    Writes a batch of observations to weather_logs in as few round-trips as possible.
+    observations: list of dicts with city, temperature, rainfall_1h, humidity, lat, lon
+                  (timestamp is optional and defaults to now).
+    Also upserts current_conditions for the same zones.
+    Does NOT commit, so callers can keep the write in their own transaction.
+    Returns per-batch timings: [{"rows": n, "ms": t}, ...]
+    """
+    method = method or INGEST_METHOD
+    batch_size = batch_size or INGEST_BATCH_SIZE
+    now = datetime.datetime.now()
+
+    rows = [{**{c: obs.get(c) for c in COLUMNS}, "timestamp": obs.get("timestamp") or now} for obs in observations]
+    if not rows:
+        return []
+
+    timings = []
+    for start in range(0, len(rows), batch_size):
+        chunk = rows[start:start + batch_size]
+        t0 = time.perf_counter()
+
+        if method == "copy" and db.get_bind().dialect.name == "postgresql":
+            _copy_rows(db, chunk)
+        else:
+            # One multi-row INSERT ... VALUES (...), (...), ... per chunk
+            db.execute(insert(WeatherLog).values(chunk))
+
+        ms = (time.perf_counter() - t0) * 1000
+        timings.append({"rows": len(chunk), "ms": round(ms, 2)})
+        print(f"   💾 Batch {len(timings)}: {len(chunk)} rows in {ms:.1f}ms ({method})")
+
+    upsert_current_conditions(db, rows)
+    return timings
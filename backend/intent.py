@@ -0,0 +1,146 @@
+# backend/intent.py
+import os
+import re
+import difflib
+import threading
+from collections import deque, namedtuple
+from backend.zone_registry import zone_registry
+
+# Typo tolerance for the fuzzy fallback (0-1, higher = stricter, 0 disables it)
+INTENT_FUZZY_CUTOFF = float(os.getenv("INTENT_FUZZY_CUTOFF", "0.85"))
+
+Match = namedtuple("Match", ["kind", "keyword", "value", "start", "end", "fuzzy"])
+
+def normalize(text):
+    """Lowercase, punctuation -> spaces, single spaces, padded so every word has a boundary on both sides."""
+    return " " + " ".join(re.sub(r"[^\w']+", " ", (text or "").lower()).split()) + " "
+
+class AhoCorasick:
+    """
+    Multi-pattern automaton: finds every keyword in one pass over the text,
+    no matter how many keywords there are.
+    """
+
+    def __init__(self, patterns):
+        # patterns: {keyword: payload}
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for keyword, payload in patterns.items():
+            node = 0
+            for ch in keyword:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                    self.goto[node][ch] = nxt
+                node = nxt
+            self.out[node].append((keyword, payload))
+
+        # Breadth-first pass to build failure links
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def find(self, text):
+        """Yields (start, end, keyword, payload) for every occurrence."""
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            for keyword, payload in self.out[node]:
+                yield i - len(keyword) + 1, i + 1, keyword, payload
+
+class IntentMatcher:
+    """
+    Compiled matcher for WhatsApp messages.
+    vocab: {kind: {keyword: value}}, e.g. {"zone": {"kisumu": "Kisumu Central"}, "sign": {"ants": "ants"}}
+    """
+
+    def __init__(self, vocab):
+        patterns = {}
+        self._fuzzy = {}   # kind -> first letter -> [keywords]
+        for kind, keywords in vocab.items():
+            for keyword, value in keywords.items():
+                key = normalize(keyword).strip()
+                if not key:
+                    continue
+                # Same keyword in two kinds: both are kept
+                patterns.setdefault(key, []).append((kind, value))
+                self._fuzzy.setdefault(kind, {}).setdefault(key[0], []).append(key)
+        self._patterns = patterns
+        self._automaton = AhoCorasick(patterns)
+
+    def matches(self, text, kind=None):
+        """All whole-word matches, longest first, overlapping shorter ones removed."""
+        text = normalize(text)
+        found = []
+        for start, end, keyword, payloads in self._automaton.find(text):
+            # Whole words only ("ants" must not match inside "plants")
+            if text[start - 1] != " " or text[end] != " ":
+                continue
+            for k, value in payloads:
+                if kind is None or k == kind:
+                    found.append(Match(k, keyword, value, start, end, False))
+
+        found.sort(key=lambda m: (-(m.end - m.start), m.start))
+        picked, taken = [], []
+        for m in found:
+            if all(m.end <= s or m.start >= e for s, e in taken):
+                picked.append(m)
+                taken.append((m.start, m.end))
+        return picked
+
+    def _fuzzy_match(self, text, kind):
+        if not INTENT_FUZZY_CUTOFF:
+            return None
+        words = normalize(text).split()
+        # Try two-word phrases before single words (longest match wins here too)
+        candidates = [" ".join(words[i:i + 2]) for i in range(len(words) - 1)] + words
+        for candidate in candidates:
+            if len(candidate) < 4:
+                continue
+            pool = self._fuzzy.get(kind, {}).get(candidate[0], [])
+            close = difflib.get_close_matches(candidate, pool, n=1, cutoff=INTENT_FUZZY_CUTOFF)
+            if close:
+                keyword = close[0]
+                value = next(v for k, v in self._patterns[keyword] if k == kind)
+                return Match(kind, keyword, value, None, None, True)
+        return None
+
+    def best(self, text, kind):
+        """Longest exact match of one kind, falling back to a typo-tolerant match."""
+        exact = self.matches(text, kind)
+        return exact[0] if exact else self._fuzzy_match(text, kind)
+
+_matcher = None
+_matcher_version = None
+_matcher_lock = threading.Lock()
+
+def get_matcher(zone_aliases, signs):
+    """
+    Returns the compiled matcher, rebuilding it only when the zone registry changes.
+    zone_aliases: {"what users type": "Exact DB Name"}; every registry zone name is added automatically.
+    signs: {keyword: sign_key}
+    """
+    global _matcher, _matcher_version
+    zones = zone_registry.zones()
+    with _matcher_lock:
+        if _matcher is None or _matcher_version != zone_registry.version:
+            vocab = {
+                "zone": {**{z["name"]: z["name"] for z in zones}, **zone_aliases},
+                "sign": dict(signs),
+            }
+            _matcher = IntentMatcher(vocab)
+            _matcher_version = zone_registry.version
+        return _matcher
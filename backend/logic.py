@@ -4,7 +4,8 @@ import os
 from dotenv import load_dotenv
 from sqlalchemy.orm import Session
 from backend.database import SessionLocal
-from backend.models import WeatherLog
+from backend.ingest import bulk_insert_weather_logs
+from backend.conditions_cache import latest_conditions
 
 load_dotenv()
 API_KEY = os.getenv("OPENWEATHER_API_KEY")
@@ -59,7 +60,7 @@ def fetch_national_weather(db: Session):
 
     print(f"🌍 Starting National Weather Scan for {len(LOCATIONS)} regions...")
     
-    count = 0
+    observations = []
     for loc in LOCATIONS:
         params = {
             "lat": loc["lat"], "lon": loc["lon"],
@@ -75,25 +76,26 @@ def fetch_national_weather(db: Session):
                 rain = data.get("rain", {}).get("1h", 0.0)
                 humidity = data["main"]["humidity"]
                 
-                # Save to DB
-                log = WeatherLog(
-                    city=loc["city"],
-                    temperature=temp,
-                    rainfall_1h=rain,
-                    humidity=humidity,
-                    lat=loc["lat"],
-                    lon=loc["lon"]
-                )
-                db.add(log)
-                count += 1
+                # Queue for the bulk write
+                observations.append({
+                    "city": loc["city"],
+                    "temperature": temp,
+                    "rainfall_1h": rain,
+                    "humidity": humidity,
+                    "lat": loc["lat"],
+                    "lon": loc["lon"]
+                })
                 print(f" -> Scanned {loc['city']}: {temp}°C | Rain: {rain}mm")
             else:
                 print(f"❌ Failed to fetch {loc['city']}")
         except Exception as e:
             print(f"❌ Error {loc['city']}: {e}")
 
+    # Save to DB in one multi-row insert
+    bulk_insert_weather_logs(db, observations)
     db.commit()
-    print(f"✅ Scan Complete. {count} reports saved to database.")
+    latest_conditions.invalidate()
+    print(f"✅ Scan Complete. {len(observations)} reports saved to database.")
 
 if __name__ == "__main__":
     db = SessionLocal()
@@ -0,0 +1,66 @@
+# backend/media.py
+import os
+import threading
+import requests
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps
+from backend.vision import dhash
+
+# --- MEDIA PIPELINE SETTINGS ---
+MEDIA_MAX_BYTES = int(os.getenv("MEDIA_MAX_BYTES", str(8 * 1024 * 1024)))   # Hard cap per download
+MEDIA_TARGET_SIDE = int(os.getenv("MEDIA_TARGET_SIDE", "1024"))             # Longest side sent to the model
+MEDIA_JPEG_QUALITY = int(os.getenv("MEDIA_JPEG_QUALITY", "85"))
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", "2"))
+MEDIA_TIMEOUT = float(os.getenv("MEDIA_TIMEOUT", "20"))
+
+CHUNK_SIZE = 64 * 1024
+
+class MediaTooLarge(Exception):
+    pass
+
+_http = requests.Session()
+
+def download_media(url, auth=None, max_bytes=MEDIA_MAX_BYTES):
+    """Streams a media file into memory, aborting as soon as it passes max_bytes."""
+    with _http.get(url, auth=auth, stream=True, timeout=MEDIA_TIMEOUT) as resp:
+        resp.raise_for_status()
+        declared = int(resp.headers.get("Content-Length") or 0)
+        if declared > max_bytes:
+            raise MediaTooLarge(f"{declared} bytes (limit {max_bytes})")
+
+        buf = bytearray()
+        for chunk in resp.iter_content(CHUNK_SIZE):
+            buf += chunk
+            if len(buf) > max_bytes:
+                raise MediaTooLarge(f"more than {max_bytes} bytes")
+        return bytes(buf)
+
+def _preprocess(data, max_side, quality):
+    """
+    Runs in a worker process: decode, fix EXIF rotation, downsample and re-encode as JPEG.
+    Returns (jpeg_bytes, perceptual_hash).
+    """
+    image = Image.open(BytesIO(data))
+    # Let the JPEG decoder skip detail we would throw away anyway (much cheaper than a full decode)
+    image.draft("RGB", (max_side, max_side))
+    image = ImageOps.exif_transpose(image).convert("RGB")
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+
+    out = BytesIO()
+    image.save(out, format="JPEG", quality=quality, optimize=True)
+    return out.getvalue(), dhash(image)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=MEDIA_WORKERS)
+        return _pool
+
+def preprocess_image(data, max_side=MEDIA_TARGET_SIDE, quality=MEDIA_JPEG_QUALITY):
+    """Decodes/downsamples off the API process (keeps CPU-heavy work away from request threads)."""
+    return _get_pool().submit(_preprocess, data, max_side, quality).result(timeout=MEDIA_TIMEOUT)
@@ -0,0 +1,55 @@
+# backend/messaging.py
+import os
+import threading
+from abc import ABC, abstractmethod
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# "twilio" in production, "stub" for local runs and tests (nothing leaves the machine)
+WHATSAPP_SENDER = os.getenv("WHATSAPP_SENDER", "twilio")
+TWILIO_WHATSAPP_FROM = os.getenv("TWILIO_WHATSAPP_FROM", "whatsapp:+14155238886")  # Twilio sandbox number
+
+class OutboundSender(ABC):
+    """Anything that can push a message to a user outside the webhook reply."""
+
+    @abstractmethod
+    def send(self, to, body):
+        ...
+
+class TwilioSender(OutboundSender):
+    def __init__(self):
+        from twilio.rest import Client
+        self.client = Client(os.getenv("TWILIO_ACCOUNT_SID"), os.getenv("TWILIO_AUTH_TOKEN"))
+
+    def send(self, to, body):
+        self.client.messages.create(from_=TWILIO_WHATSAPP_FROM, to=to, body=body)
+
+class StubSender(OutboundSender):
+    """Keeps messages in memory instead of calling Twilio."""
+
+    def __init__(self):
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send(self, to, body):
+        with self._lock:
+            self.sent.append((to, body))
+        print(f"📤 [stub] -> {to}: {body[:60]}")
+
+_sender = None
+_sender_lock = threading.Lock()
+
+def get_sender():
+    """Process-wide sender, created on first use from WHATSAPP_SENDER."""
+    global _sender
+    with _sender_lock:
+        if _sender is None:
+            _sender = StubSender() if WHATSAPP_SENDER == "stub" else TwilioSender()
+        return _sender
+
+def set_sender(sender):
+    """Swap the sender (e.g. a StubSender in tests)."""
+    global _sender
+    with _sender_lock:
+        _sender = sender
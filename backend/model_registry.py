@@ -0,0 +1,155 @@
+# backend/model_registry.py
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from backend.forecast import ForecastTable, forecast_table
+from backend.forest import Forest
+
+# Layout: <dir>/<version>/metadata.json + <slug>.pkl, <slug>.forest/ and <slug>.npz per zone; <dir>/LATEST names the live version
+MODEL_REGISTRY_DIR = os.getenv(
+    "MODEL_REGISTRY_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_registry"),
+)
+# How many zone models / forecast tables stay in memory at once
+MODEL_CACHE_SIZE = int(os.getenv("MODEL_CACHE_SIZE", "16"))
+FORECAST_CACHE_SIZE = int(os.getenv("FORECAST_CACHE_SIZE", "256"))
+
+# National model exported by scripts/train_model.py (see backend/forest.py)
+NATIONAL_FOREST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "seasonal_model.forest")
+
+def zone_slug(name):
+    """
+    'Turkana North (Kibish)' -> 'turkana_north_kibish_<8 hex>' (safe file name).
+    The readable part drops punctuation and accents, so the sha1 of the full name keeps
+    'Kibera (Soweto)' and 'Kibera Soweto' apart.
+    """
+    readable = re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+    return f"{readable}_{hashlib.sha1(name.encode('utf-8')).hexdigest()[:8]}"
+
+class LRUCache:
+    """Small thread-safe LRU: loader runs on a miss, the least recently used entry is dropped past max_entries."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        value = loader()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+class ModelRegistry:
+    """
+    Per-zone seasonal models written by scripts/train_model.py --zones.
+    Nothing is loaded at startup: metadata on first use, each model/table on its first request.
+    """
+
+    def __init__(self, root=MODEL_REGISTRY_DIR, max_models=MODEL_CACHE_SIZE, max_tables=FORECAST_CACHE_SIZE):
+        self.root = root
+        self._models = LRUCache(max_models)
+        self._tables = LRUCache(max_tables)
+        self._lock = threading.Lock()
+        self._version = None
+        self._metadata = {}
+
+    def _latest_version(self):
+        try:
+            with open(os.path.join(self.root, "LATEST")) as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def _current(self):
+        """(version, metadata.json) of the live version; swaps caches when training publishes a new one."""
+        version = self._latest_version()
+        with self._lock:
+            if version != self._version:
+                self._metadata = {}
+                if version:
+                    with open(os.path.join(self.root, version, "metadata.json")) as f:
+                        self._metadata = json.load(f)
+                self._version = version
+                self._models.clear()
+                self._tables.clear()
+            return self._version, self._metadata
+
+    def metadata(self):
+        """{} if nothing has been trained yet."""
+        return self._current()[1]
+
+    @property
+    def version(self):
+        return self._current()[0]
+
+    def zones(self):
+        return sorted(self.metadata().get("zones", {}))
+
+    def _entry(self, zone):
+        """(version, metadata entry) for a zone; entry is None if the zone has no model."""
+        version, metadata = self._current()
+        return version, metadata.get("zones", {}).get(zone)
+
+    def get_model(self, zone=None):
+        """
+        Anything with .predict(X): the memory-mapped Forest when exported (instant, shared between processes),
+        else the pickled RandomForest. zone=None = national model. None if there is no model.
+        Serving reads the precomputed tables; this is what builds one when its .npz is missing.
+        """
+        if zone is None:
+            try:
+                # Retraining swaps the directory in, so meta.json's mtime identifies the live forest
+                mtime = os.path.getmtime(os.path.join(NATIONAL_FOREST_PATH, "meta.json"))
+            except OSError:
+                return None
+            return self._models.get((None, mtime), lambda: Forest.load(NATIONAL_FOREST_PATH))
+
+        version, entry = self._entry(zone)
+        if entry is None:
+            return None
+        if entry.get("forest"):
+            path = os.path.join(self.root, version, entry["forest"])
+            return self._models.get((version, zone), lambda: Forest.load(path))
+
+        import joblib   # Older registry versions only (pulls in scikit-learn on unpickle)
+        path = os.path.join(self.root, version, entry["model"])
+        return self._models.get((version, zone), lambda: joblib.load(path))
+
+    def get_forecast_table(self, zone):
+        version, entry = self._entry(zone)
+        if entry is None:
+            return None
+        path = os.path.join(self.root, version, entry["table"])
+        return self._tables.get((version, zone), lambda: ForecastTable(path, lambda: self.get_model(zone)))
+
+    def forecast(self, zone, days, start=None):
+        """Zone forecast from its precomputed table, falling back to the national table."""
+        table = self.get_forecast_table(zone) if zone else None
+        return (table if table is not None else forecast_table).forecast(days, start)
+
+    def stats(self):
+        return {"version": self.version, "zones": len(self.zones()),
+                "models_loaded": len(self._models), "tables_loaded": len(self._tables)}
+
+# Shared instance for the whole process
+model_registry = ModelRegistry()
+# No seasonal_forecast.npz (e.g. only the forest was deployed): build the national table from the forest
+forecast_table.model_loader = model_registry.get_model
@@ -1,17 +1,89 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, String, Float, DateTime, Date, Index
 from sqlalchemy.sql import func
 from geoalchemy2 import Geometry
 from .database import Base
 
 class WeatherLog(Base):
     __tablename__ = "weather_logs"
-    id = Column(Integer, primary_key=True, index=True)
+    # Monthly range partitions on timestamp (see backend/partitions.py)
+    __table_args__ = {"postgresql_partition_by": "RANGE (timestamp)"}
+
+    # Postgres requires the partition key inside the primary key
+    id = Column(Integer, primary_key=True, autoincrement=True)
     city = Column(String)
     temperature = Column(Float)
     rainfall_1h = Column(Float)
     humidity = Column(Float)
     lat = Column(Float)
     lon = Column(Float)
+    timestamp = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
+
+# Every lookup is "this city, newest first"
+Index("ix_weather_logs_city_timestamp", WeatherLog.city, WeatherLog.timestamp.desc())
+
+class CurrentCondition(Base):
+    """One row per zone: the latest reading, upserted by the ingestion job."""
+    __tablename__ = "current_conditions"
+    city = Column(String, primary_key=True)
+    temperature = Column(Float)
+    rainfall_1h = Column(Float)
+    humidity = Column(Float)
+    lat = Column(Float)
+    lon = Column(Float)
+    timestamp = Column(DateTime(timezone=True))
+
+class WeatherHourlyRollup(Base):
+    """Raw readings downsampled to one row per zone per hour (see backend/rollups.py)."""
+    __tablename__ = "weather_rollup_hourly"
+    city = Column(String, primary_key=True)
+    hour = Column(DateTime(timezone=True), primary_key=True)
+    temp_min = Column(Float)
+    temp_max = Column(Float)
+    temp_mean = Column(Float)
+    rain_max_1h = Column(Float)
+    humidity_mean = Column(Float)
+    samples = Column(Integer)
+
+class WeatherDailyRollup(Base):
+    """Daily per-zone aggregates, built from the hourly rollup. Kept forever."""
+    __tablename__ = "weather_rollup_daily"
+    city = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    temp_min = Column(Float)
+    temp_max = Column(Float)
+    temp_mean = Column(Float)
+    rain_total = Column(Float)
+    rain_max_1h = Column(Float)
+    humidity_mean = Column(Float)
+    samples = Column(Integer)
+
+class RollupWatermark(Base):
+    """Newest weather_logs timestamp already folded into the rollups, per job."""
+    __tablename__ = "rollup_watermarks"
+    name = Column(String, primary_key=True)
+    last_timestamp = Column(DateTime(timezone=True))
+
+class ZoneAlertState(Base):
+    """Current alert state per zone (only changes on a transition, see backend/alert_engine.py)."""
+    __tablename__ = "zone_alert_states"
+    city = Column(String, primary_key=True)
+    status = Column(String)
+    label = Column(String)
+    severity = Column(Integer)
+    since = Column(DateTime(timezone=True))
+
+class AlertEvent(Base):
+    """Append-only log of alert transitions (opened / escalated / downgraded / closed)."""
+    __tablename__ = "alert_events"
+    id = Column(Integer, primary_key=True, index=True)
+    city = Column(String, index=True)
+    event = Column(String)
+    status = Column(String)
+    previous_status = Column(String)
+    label = Column(String)
+    severity = Column(Integer)
+    rainfall_1h = Column(Float)
+    temperature = Column(Float)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
 
 class RiskZone(Base):
@@ -24,5 +96,9 @@ class RiskZone(Base):
     disaster_type = Column(String)
     description = Column(String)  
     
-    # The Shape
-    geom = Column(Geometry(geometry_type='POLYGON', srid=4326))
\ No newline at end of file
+    # The Shape (GiST-indexed for point-in-zone lookups, see backend/spatial.py)
+    geom = Column(Geometry(geometry_type='POLYGON', srid=4326, spatial_index=True))
+
+    # Representative point inside the polygon, computed once (see backend/zone_registry.py)
+    centroid_lat = Column(Float)
+    centroid_lon = Column(Float)
\ No newline at end of file
@@ -0,0 +1,111 @@
+# backend/partitions.py
+import datetime
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from backend.models import WeatherLog
+
+PARENT = WeatherLog.__tablename__
+DEFAULT_PARTITION = f"{PARENT}_default"
+
+def month_start(d):
+    return datetime.date(d.year, d.month, 1)
+
+def add_months(d, n):
+    month = d.month - 1 + n
+    return datetime.date(d.year + month // 12, month % 12 + 1, 1)
+
+def partition_name(start):
+    """weather_logs_y2026m10 style names, so they sort chronologically."""
+    return f"{PARENT}_y{start.year}m{start.month:02d}"
+
+def is_partitioned(db: Session):
+    """False if weather_logs is still the old plain table (run `manage_partitions migrate`)."""
+    return bool(db.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :t"
+    ), {"t": PARENT}).first())
+
+def list_partitions(db: Session):
+    """Returns the names of all partitions currently attached to weather_logs."""
+    rows = db.execute(text("""
+        SELECT child.relname FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = :t ORDER BY child.relname
+    """), {"t": PARENT}).all()
+    return [r[0] for r in rows]
+
+def create_partition(db: Session, start):
+    name = partition_name(start)
+    db.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{add_months(start, 1).isoformat()}')"
+    ))
+    return name
+
+def create_partitions(db: Session, months_ahead=3, start=None):
+    """
+    Makes sure monthly partitions exist from `start` (default: this month) up to N months ahead,
+    plus a DEFAULT partition so a stray timestamp never makes an insert fail.
+    """
+    if not is_partitioned(db):
+        print(f"⚠️ {PARENT} is not partitioned yet. Run: python -m scripts.manage_partitions migrate")
+        return []
+
+    first = month_start(start or datetime.date.today())
+    last = add_months(month_start(datetime.date.today()), months_ahead)
+    created = []
+    current = first
+    while current <= last:
+        created.append(create_partition(db, current))
+        current = add_months(current, 1)
+
+    db.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT} DEFAULT"))
+    db.commit()
+    return created
+
+def expire_partitions(db: Session, keep_months=12, drop=False):
+    """
+    Detaches (or drops) monthly partitions older than `keep_months`.
+    Detached partitions stay as normal tables, ready to be dumped/archived cheaply.
+    """
+    cutoff = partition_name(add_months(month_start(datetime.date.today()), -keep_months))
+    expired = [p for p in list_partitions(db) if p != DEFAULT_PARTITION and p < cutoff]
+
+    for name in expired:
+        db.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"))
+        if drop:
+            db.execute(text(f"DROP TABLE {name}"))
+        print(f"   🗄️ {'Dropped' if drop else 'Detached'} {name}")
+    db.commit()
+    return expired
+
+def migrate_to_partitioned(db: Session, months_ahead=3):
+    """
+    One-off upgrade of an old, unpartitioned weather_logs table.
+    The old table is renamed to weather_logs_legacy (kept for manual cleanup) and its rows are copied across.
+    """
+    if is_partitioned(db):
+        print(f"✅ {PARENT} is already partitioned.")
+        return
+
+    legacy = f"{PARENT}_legacy"
+    db.execute(text(f"ALTER TABLE {PARENT} RENAME TO {legacy}"))
+    # The old id index keeps its name after the rename, which would clash with the new table
+    db.execute(text(f"ALTER INDEX IF EXISTS ix_{PARENT}_id RENAME TO ix_{legacy}_id"))
+    db.execute(text(f"ALTER TABLE {legacy} RENAME CONSTRAINT {PARENT}_pkey TO {legacy}_pkey"))
+    db.commit()
+
+    WeatherLog.__table__.create(bind=db.get_bind())
+
+    oldest = db.execute(text(f"SELECT min(timestamp) FROM {legacy}")).scalar()
+    create_partitions(db, months_ahead, start=oldest.date() if oldest else None)
+
+    db.execute(text(f"""
+        INSERT INTO {PARENT} (id, city, temperature, rainfall_1h, humidity, lat, lon, timestamp)
+        SELECT id, city, temperature, rainfall_1h, humidity, lat, lon, coalesce(timestamp, now()) FROM {legacy}
+    """))
+    db.execute(text(
+        f"SELECT setval(pg_get_serial_sequence('{PARENT}', 'id'), coalesce((SELECT max(id) FROM {PARENT}), 1))"
+    ))
+    db.commit()
+    print(f"✅ Migrated {legacy} into partitioned {PARENT}.")
@@ -0,0 +1,146 @@
+# backend/polling.py
+import os
+import time
+import datetime
+import threading
+from backend.zone_registry import zone_registry
+from backend.conditions_cache import latest_conditions
+from backend.weather_service import plan_scan, run_scan
+
+# --- ADAPTIVE POLLING SETTINGS ---
+POLL_TICK_MINUTES = int(os.getenv("POLL_TICK_MINUTES", "5"))
+# Global API budget (calls per minute) and how many calls we may burst in one go.
+# Default burst = one tick's worth of budget, otherwise a tick could never spend what accrued since the last one
+API_BUDGET_PER_MIN = float(os.getenv("API_BUDGET_PER_MIN", "30"))
+API_BURST = int(os.getenv("API_BURST", str(int(API_BUDGET_PER_MIN * POLL_TICK_MINUTES))))
+
+MIN_INTERVAL = 5      # minutes
+MAX_INTERVAL = 360    # minutes
+
+# Baseline cadence per risk level when it is dry (minutes)
+BASE_INTERVALS = {"Critical": 30, "High": 60, "Medium": 120, "Low": 240}
+DEFAULT_INTERVAL = 180
+
+# Lower number = polled first when the budget is tight
+RISK_PRIORITY = {"Critical": 0, "High": 1, "Medium": 2, "Low": 3}
+
+class TokenBucket:
+    """Classic token bucket: refills at `rate` tokens per minute, holds at most `capacity`."""
+
+    def __init__(self, rate_per_min, capacity):
+        self.rate = rate_per_min / 60.0
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, wanted):
+        """Takes up to `wanted` tokens and returns how many were granted."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            granted = int(min(wanted, self.tokens))
+            self.tokens -= granted
+            return granted
+
+def polling_interval(risk_level, rain, previous_rain=None):
+    """
+    Minutes until a zone should be polled again.
+    Critical zones with active heavy rain drop to MIN_INTERVAL, dry low-risk zones stretch to hours.
+    """
+    interval = BASE_INTERVALS.get(risk_level, DEFAULT_INTERVAL)
+    rain = rain or 0.0
+
+    if rain > 10:        # Heavy rain: flood/landslide conditions building
+        interval = MIN_INTERVAL if risk_level == "Critical" else interval / 4
+    elif rain > 0.5:     # Light rain
+        interval /= 2
+
+    # Rain increasing quickly since the last reading
+    if previous_rain is not None and rain - previous_rain > 5:
+        interval /= 2
+
+    return max(MIN_INTERVAL, min(MAX_INTERVAL, interval))
+
+class AdaptivePoller:
+    """
+    Decides which zones are due on every scheduler tick and scans only those,
+    most urgent first, within the API token budget.
+    """
+
+    def __init__(self, bucket=None):
+        self.bucket = bucket or TokenBucket(API_BUDGET_PER_MIN, API_BURST)
+        self.next_due = {}     # zone name -> datetime
+        self.last_rain = {}    # zone name -> mm
+
+    def _schedule(self, zone, rain, when):
+        interval = polling_interval(zone["risk_level"], rain, self.last_rain.get(zone["name"]))
+        self.next_due[zone["name"]] = when + datetime.timedelta(minutes=interval)
+        self.last_rain[zone["name"]] = rain
+
+    def due_zones(self, now=None):
+        now = now or datetime.datetime.now()
+        snapshot = latest_conditions.snapshot()
+        due = []
+        for zone in zone_registry.zones():
+            if zone["lat"] is None:
+                continue
+            if zone["name"] not in self.next_due:
+                # First time we see this zone: start from its last stored reading (if any)
+                reading = snapshot.get(zone["name"])
+                if reading is None or reading.timestamp is None:
+                    self.next_due[zone["name"]] = now
+                else:
+                    last = reading.timestamp.astimezone().replace(tzinfo=None)
+                    self._schedule(zone, reading.rainfall_1h, last)
+            if self.next_due[zone["name"]] <= now:
+                due.append(zone)
+
+        # Most urgent first: risk level, then how overdue
+        due.sort(key=lambda z: (RISK_PRIORITY.get(z["risk_level"], 4), self.next_due[z["name"]]))
+        return due
+
+    def tick(self, now=None):
+        now = now or datetime.datetime.now()
+        return self._poll(self.due_zones(now), now)
+
+    def full_scan(self, now=None):
+        """
+        Every zone at once (startup), charged to the same token bucket as the ticks:
+        cells beyond the budget stay due and are picked up by the next ticks.
+        """
+        now = now or datetime.datetime.now()
+        zones = [z for z in zone_registry.zones() if z["lat"] is not None]
+        zones.sort(key=lambda z: RISK_PRIORITY.get(z["risk_level"], 4))
+        for zone in zones:
+            self.next_due[zone["name"]] = now
+        return self._poll(zones, now)
+
+    def _poll(self, due, now):
+        """Scans as many of `due` (most urgent first) as the budget allows and reschedules them."""
+        if not due:
+            return []
+
+        # Budget is counted in API calls (grid cells), not zones
+        cells = list(plan_scan(due).values())
+        granted = self.bucket.take(len(cells))
+        if granted < len(cells):
+            print(f"⏳ API budget: polling {granted}/{len(cells)} due cells, the rest wait for the next tick.")
+        chosen = [z for cell in cells[:granted] for z in cell["zones"]]
+        if not chosen:
+            return []
+
+        print(f"📡 Adaptive scan: {len(chosen)} of {len(due)} due zones.")
+        observations = run_scan(chosen)
+
+        by_name = {z["name"]: z for z in chosen}
+        for obs in observations:
+            self._schedule(by_name[obs["city"]], obs["rainfall_1h"], now)
+        # Zones whose fetch failed get retried after the minimum interval instead of hammering the API
+        for name in by_name.keys() - {obs["city"] for obs in observations}:
+            self.next_due[name] = now + datetime.timedelta(minutes=MIN_INTERVAL)
+        return observations
+
+# Shared instance for the scheduler
+adaptive_poller = AdaptivePoller()
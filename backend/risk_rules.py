@@ -0,0 +1,111 @@
+# backend/risk_rules.py
+import numpy as np
+import pandas as pd
+from backend.conditions_cache import latest_conditions
+from backend.zone_registry import zone_registry
+
+# --- THE RULE BOOK (one place for every threshold) ---
+# Checked top to bottom, first match wins. "hazard" is matched against RiskZone.disaster_type.
+# "hold" is the looser condition a zone must keep meeting to STAY in that status (hysteresis, no flapping).
+RULES = [
+    {"status": "critical_rain", "label": "🚨 CRITICAL: Heavy Rainfall", "severity": 3, "rain_gt": 50,
+     "hold": {"rain_gt": 35}},
+    {"status": "landslide", "label": "⛰️ ALERT: LANDSLIDE", "severity": 2, "hazard": "Landslide", "rain_gt": 15,
+     "hold": {"rain_gt": 10}},
+    {"status": "flood", "label": "⚠️ ALERT: FLOOD", "severity": 2, "hazard": "Flood|Backflow|Overflow", "rain_gt": 10,
+     "hold": {"rain_gt": 6}},
+    {"status": "drought", "label": "☀️ ALERT: DROUGHT", "severity": 2, "hazard": "Drought", "temp_gt": 32, "rain_lt": 1,
+     "hold": {"temp_gt": 30, "rain_lt": 2}},
+    {"status": "heavy_rain", "label": "⚠️ Warning: Heavy Rain", "severity": 1, "rain_gt": 10,
+     "hold": {"rain_gt": 6}},
+]
+NORMAL = {"status": "normal", "label": "🟢 Normal", "severity": 0}
+
+_TABLE = RULES + [NORMAL]
+_STATUS = np.array([r["status"] for r in _TABLE])
+_LABEL = np.array([r["label"] for r in _TABLE])
+_SEVERITY = np.array([r["severity"] for r in _TABLE])
+
+def _rule_mask(rule, rain, temp, hazards):
+    mask = np.ones(len(rain), dtype=bool)
+    if "hazard" in rule:
+        mask &= hazards.str.contains(rule["hazard"], case=False, na=False).to_numpy()
+    if "rain_gt" in rule:
+        mask &= rain > rule["rain_gt"]
+    if "rain_lt" in rule:
+        mask &= rain < rule["rain_lt"]
+    if "temp_gt" in rule:
+        mask &= temp > rule["temp_gt"]
+    return mask
+
+def evaluate(df):
+    """
+    Classifies every row at once.
+    df needs rainfall_1h and temperature (disaster_type is optional: without it only generic rules apply).
+    Returns a copy with status, label and severity columns added.
+    """
+    rain = df["rainfall_1h"].fillna(0.0).to_numpy(dtype=float)
+    temp = df["temperature"].to_numpy(dtype=float)
+    hazards = df["disaster_type"] if "disaster_type" in df else pd.Series([None] * len(df), index=df.index, dtype=object)
+
+    masks = [_rule_mask(rule, rain, temp, hazards) for rule in RULES]
+    # Index of the first matching rule per row, len(RULES) (= NORMAL) if none matched
+    idx = np.select(masks, np.arange(len(RULES)), default=len(RULES)) if len(df) else np.array([], dtype=int)
+
+    out = df.copy()
+    out["status"] = _STATUS[idx]
+    out["label"] = _LABEL[idx]
+    out["severity"] = _SEVERITY[idx]
+    return out
+
+def apply_hysteresis(classified, previous_status):
+    """
+    Keeps a zone in its previous alert status while that rule's "hold" condition is still met,
+    unless a more severe rule has fired. previous_status: Series of status names aligned with `classified`.
+    """
+    out = classified.copy()
+    rain = out["rainfall_1h"].fillna(0.0).to_numpy(dtype=float)
+    temp = out["temperature"].to_numpy(dtype=float)
+    hazards = out["disaster_type"] if "disaster_type" in out else pd.Series([None] * len(out), index=out.index, dtype=object)
+    previous = previous_status.reindex(out.index).fillna(NORMAL["status"]).to_numpy()
+
+    for i, rule in enumerate(RULES):
+        was_here = previous == rule["status"]
+        if not was_here.any():
+            continue
+        hold_rule = {**rule, **rule.get("hold", {})}
+        keep = was_here & _rule_mask(hold_rule, rain, temp, hazards) & (out["severity"].to_numpy() <= rule["severity"])
+        out.loc[keep, "status"] = _STATUS[i]
+        out.loc[keep, "label"] = _LABEL[i]
+        out.loc[keep, "severity"] = _SEVERITY[i]
+    return out
+
+def classify_snapshot(snapshot):
+    """
+    Classifies a ConditionsSnapshot once and stores the result on it (one classification per ingestion run).
+    Hysteresis is applied against the persisted zone_alert_states loaded with the snapshot,
+    so every channel shows the same stable status the alert engine records.
+    """
+    if snapshot.statuses is None:
+        df = pd.DataFrame(list(snapshot.records.values()), columns=[
+            "city", "temperature", "rainfall_1h", "humidity", "lat", "lon", "timestamp",
+        ])
+        # object dtype even when empty (an empty list would become float and break .str in _rule_mask)
+        df["disaster_type"] = pd.Series(
+            [(zone_registry.get(c) or {}).get("disaster_type") for c in df["city"]], index=df.index, dtype=object,
+        )
+        classified = evaluate(df).set_index("city", drop=False)
+        snapshot.statuses = apply_hysteresis(classified, pd.Series(snapshot.alert_states, dtype=object))
+    return snapshot.statuses
+
+def zone_statuses():
+    """Precomputed statuses for every zone (DataFrame indexed by city)."""
+    return classify_snapshot(latest_conditions.snapshot())
+
+def zone_status(city, snapshot=None):
+    """Status dict (status, label, severity) for one zone, NORMAL if we have no reading."""
+    statuses = classify_snapshot(snapshot) if snapshot is not None else zone_statuses()
+    if city not in statuses.index:
+        return dict(NORMAL)
+    row = statuses.loc[city]
+    return {"status": row["status"], "label": row["label"], "severity": int(row["severity"])}
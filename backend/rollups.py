@@ -0,0 +1,111 @@
+# backend/rollups.py
+import os
+import datetime
+from sqlalchemy import text, select, func
+from sqlalchemy.orm import Session
+from backend.models import WeatherLog, WeatherHourlyRollup, WeatherDailyRollup, RollupWatermark
+
+# --- RETENTION POLICY (days, 0 = keep forever) ---
+RAW_RETENTION_DAYS = int(os.getenv("RAW_RETENTION_DAYS", "30"))
+HOURLY_RETENTION_DAYS = int(os.getenv("HOURLY_RETENTION_DAYS", "365"))
+
+WATERMARK = "weather_rollup"
+
+# Raw readings -> one row per zone per hour.
+# rain_max_1h is the max of the "last hour" readings, so extra polls in the same hour don't double count.
+HOURLY_SQL = text("""
+    INSERT INTO weather_rollup_hourly (city, hour, temp_min, temp_max, temp_mean, rain_max_1h, humidity_mean, samples)
+    SELECT city, date_trunc('hour', timestamp), min(temperature), max(temperature), avg(temperature),
+           max(rainfall_1h), avg(humidity), count(*)
+    FROM weather_logs
+    WHERE timestamp >= date_trunc('hour', CAST(:since AS timestamptz)) AND timestamp <= :until
+    GROUP BY city, date_trunc('hour', timestamp)
+    ON CONFLICT (city, hour) DO UPDATE SET
+        temp_min = EXCLUDED.temp_min, temp_max = EXCLUDED.temp_max, temp_mean = EXCLUDED.temp_mean,
+        rain_max_1h = EXCLUDED.rain_max_1h, humidity_mean = EXCLUDED.humidity_mean, samples = EXCLUDED.samples
+""")
+
+# Hourly rollup -> one row per zone per day.
+DAILY_SQL = text("""
+    INSERT INTO weather_rollup_daily (city, day, temp_min, temp_max, temp_mean, rain_total, rain_max_1h, humidity_mean, samples)
+    SELECT city, CAST(hour AS date), min(temp_min), max(temp_max),
+           sum(temp_mean * samples) / sum(samples),
+           sum(rain_max_1h), max(rain_max_1h),
+           sum(humidity_mean * samples) / sum(samples),
+           sum(samples)
+    FROM weather_rollup_hourly
+    WHERE hour >= date_trunc('day', CAST(:since AS timestamptz))
+    GROUP BY city, CAST(hour AS date)
+    ON CONFLICT (city, day) DO UPDATE SET
+        temp_min = EXCLUDED.temp_min, temp_max = EXCLUDED.temp_max, temp_mean = EXCLUDED.temp_mean,
+        rain_total = EXCLUDED.rain_total, rain_max_1h = EXCLUDED.rain_max_1h,
+        humidity_mean = EXCLUDED.humidity_mean, samples = EXCLUDED.samples
+""")
+
+def run_rollups(db: Session, retention=True):
+    """
+    Incrementally folds new weather_logs rows into the hourly and daily rollups.
+    Only the hours/days touched since the last watermark are recomputed.
+    retention=False leaves apply_retention to the caller (e.g. to archive raw rows first).
+    Returns the new watermark (or None if there was nothing to do).
+    """
+    mark = db.get(RollupWatermark, WATERMARK)
+    since = mark.last_timestamp if mark else None
+
+    newer = select(func.min(WeatherLog.timestamp), func.max(WeatherLog.timestamp))
+    if since is not None:
+        newer = newer.where(WeatherLog.timestamp > since)
+    first_new, until = db.execute(newer).one()
+
+    if until is None:
+        return None
+
+    # Re-aggregate from the start of the hour the watermark (or the oldest new row) falls in
+    since = since or first_new
+    db.execute(HOURLY_SQL, {"since": since, "until": until})
+    db.execute(DAILY_SQL, {"since": since})
+
+    if mark is None:
+        mark = RollupWatermark(name=WATERMARK)
+        db.add(mark)
+    mark.last_timestamp = until
+    db.commit()
+
+    print(f"📊 Rollups updated up to {until:%Y-%m-%d %H:%M}.")
+    if retention:
+        apply_retention(db, until)
+    return until
+
+def apply_retention(db: Session, watermark):
+    """
+    Prunes raw rows (and old hourly rollups) that are past retention AND already rolled up.
+    Whole months of raw data are cheaper to drop with `scripts.manage_partitions prune`.
+    """
+    if RAW_RETENTION_DAYS:
+        # Never delete the hour the watermark sits in, it is re-aggregated on the next run
+        raw_cutoff = min(
+            datetime.datetime.now(watermark.tzinfo) - datetime.timedelta(days=RAW_RETENTION_DAYS),
+            watermark.replace(minute=0, second=0, microsecond=0),
+        )
+        deleted = db.query(WeatherLog).filter(WeatherLog.timestamp < raw_cutoff).delete(synchronize_session=False)
+        if deleted:
+            print(f"   🧹 Pruned {deleted} raw weather logs older than {raw_cutoff:%Y-%m-%d}.")
+
+    if HOURLY_RETENTION_DAYS:
+        hourly_cutoff = min(
+            datetime.datetime.now(watermark.tzinfo) - datetime.timedelta(days=HOURLY_RETENTION_DAYS),
+            watermark.replace(hour=0, minute=0, second=0, microsecond=0),
+        )
+        db.query(WeatherHourlyRollup).filter(WeatherHourlyRollup.hour < hourly_cutoff).delete(synchronize_session=False)
+
+    db.commit()
+
+def get_daily_trend(db: Session, city, days=90):
+    """Long-range view for one zone, read from the small daily rollup table."""
+    since = datetime.date.today() - datetime.timedelta(days=days)
+    return (
+        db.query(WeatherDailyRollup)
+        .filter(WeatherDailyRollup.city == city, WeatherDailyRollup.day >= since)
+        .order_by(WeatherDailyRollup.day)
+        .all()
+    )
@@ -0,0 +1,137 @@
+# backend/spatial.py
+import threading
+import numpy as np
+import shapely
+from shapely import STRtree
+from geoalchemy2.shape import to_shape
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from backend.database import SessionLocal
+from backend.models import RiskZone
+from backend.zone_registry import zone_registry
+
+KM_PER_DEGREE = 111.32  # Good enough this close to the equator
+
+def ensure_spatial_index(db: Session):
+    """GiST index on the zone polygons (older databases were created without one)."""
+    db.execute(text("CREATE INDEX IF NOT EXISTS idx_risk_zones_geom ON risk_zones USING GIST (geom)"))
+    db.commit()
+
+class ZoneIndex:
+    """
+    In-memory STRtree over all RiskZone polygons, rebuilt whenever zone_registry.version changes.
+    Answers "which zone is this point in?" without touching the database; single-point lookups
+    fall back to PostGIS (find_zones_db) while the tree is being (re)built in the background.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tree = None
+        self._zones = []
+        self._version = None
+        self._loading = False
+
+    def load(self, db: Session = None, version=None):
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            rows = db.query(RiskZone).filter(RiskZone.geom.isnot(None)).all()
+            zones = [{
+                "id": z.id, "name": z.name, "county": z.county,
+                "risk_level": z.risk_level, "disaster_type": z.disaster_type,
+            } for z in rows]
+            tree = STRtree([to_shape(z.geom) for z in rows])
+        finally:
+            if own_session:
+                db.close()
+        with self._lock:
+            self._zones, self._tree, self._version = zones, tree, version
+        print(f"🗺️ Spatial index loaded: {len(zones)} zones.")
+
+    def is_current(self):
+        zone_registry.zones()   # Refreshes the registry (and its version) once its TTL is up
+        return self._tree is not None and self._version == zone_registry.version
+
+    def _ensure_loaded(self):
+        if not self.is_current():
+            self.load(version=zone_registry.version)
+
+    def _load_in_background(self):
+        with self._lock:
+            if self._loading:
+                return
+            self._loading = True
+
+        def _run():
+            try:
+                self.load(version=zone_registry.version)
+            except Exception as e:
+                print(f"❌ SPATIAL INDEX ERROR: {e}")
+            finally:
+                self._loading = False
+
+        threading.Thread(target=_run, name="zone-index-load", daemon=True).start()
+
+    def find_zones_batch(self, points, nearest=True):
+        """
+        points: list of (lat, lon).
+        Returns one list per point: every containing zone, or (if none and nearest=True)
+        the single nearest zone with its distance in km.
+        """
+        self._ensure_loaded()
+        tree, zones = self._tree, self._zones
+        results = [[] for _ in points]
+        if not points or not zones:
+            return results
+
+        lats, lons = np.asarray(points, dtype=float).T
+        geoms = shapely.points(lons, lats)
+
+        # 1. Point-in-polygon for all points at once
+        point_idx, zone_idx = tree.query(geoms, predicate="intersects")
+        for p, z in zip(point_idx, zone_idx):
+            results[p].append({**zones[z], "match": "inside", "distance_km": 0.0})
+
+        # 2. Nearest zone for points that fell outside every polygon
+        missing = [i for i, r in enumerate(results) if not r]
+        if nearest and missing:
+            (point_idx, zone_idx), dist = tree.query_nearest(geoms[missing], return_distance=True, all_matches=False)
+            for p, z, d in zip(point_idx, zone_idx, dist):
+                results[missing[p]].append({**zones[z], "match": "nearest", "distance_km": round(float(d) * KM_PER_DEGREE, 2)})
+
+        return results
+
+    def find_zones(self, lat, lon, nearest=True):
+        """One point: from the STRtree, or straight from PostGIS (GiST index) until the tree is ready."""
+        if not self.is_current():
+            self._load_in_background()
+            with SessionLocal() as db:
+                matches = find_zones_db(db, lat, lon)
+            return matches if nearest else [m for m in matches if m["match"] == "inside"]
+        return self.find_zones_batch([(lat, lon)], nearest)[0]
+
+def find_zones_db(db: Session, lat, lon):
+    """
+    Same lookup done in PostGIS (uses the GiST index via ST_Contains and the <-> KNN operator).
+    ZoneIndex.find_zones answers from here while its in-memory tree is loading.
+    """
+    point = "ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)"
+    rows = db.execute(text(f"""
+        SELECT id, name, county, risk_level, disaster_type, ST_Contains(geom, {point}) AS inside,
+               ST_Distance(geom::geography, {point}::geography) / 1000 AS distance_km
+        FROM risk_zones
+        WHERE geom IS NOT NULL
+        ORDER BY geom <-> {point}
+        LIMIT 5
+    """), {"lat": lat, "lon": lon}).mappings().all()
+
+    inside = [r for r in rows if r["inside"]]
+    picked = inside or rows[:1]
+    return [{
+        "id": r["id"], "name": r["name"], "county": r["county"],
+        "risk_level": r["risk_level"], "disaster_type": r["disaster_type"],
+        "match": "inside" if r["inside"] else "nearest", "distance_km": round(r["distance_km"], 2),
+    } for r in picked]
+
+# Shared instance for the whole process
+zone_index = ZoneIndex()
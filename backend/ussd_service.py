@@ -1,153 +1,196 @@
 # backend/ussd_service.py
-from sqlalchemy.orm import Session
-from backend.models import WeatherLog
-import datetime
+import os
+import threading
+from backend.conditions_cache import ConditionsSnapshot
+from backend.risk_rules import zone_status
+from backend.zone_registry import zone_registry
 
-def handle_ussd_session(text: str, db: Session):
+# Africa's Talking cuts anything longer than this off the handset screen
+USSD_MAX_CHARS = int(os.getenv("USSD_MAX_CHARS", "182"))
+
+MORE = "98"   # Next page
+BACK = "0"    # Previous screen
+
+# --- REGIONS (County -> Menu Region) ---
+# Zones are grouped by the county stored in risk_zones; anything unmapped lands in "Other"
+REGIONS = ["Nairobi", "West/Lake", "North/Arid", "Rift Valley", "Central/East", "Coast", "Other"]
+
+COUNTY_REGIONS = {
+    "Nairobi": "Nairobi",
+    # West / Lake Victoria basin
+    "Kisumu": "West/Lake", "Homa Bay": "West/Lake", "Migori": "West/Lake", "Siaya": "West/Lake",
+    "Kisii": "West/Lake", "Nyamira": "West/Lake", "Kakamega": "West/Lake", "Vihiga": "West/Lake",
+    "Bungoma": "West/Lake", "Busia": "West/Lake",
+    # North / Arid
+    "Turkana": "North/Arid", "Marsabit": "North/Arid", "Mandera": "North/Arid", "Wajir": "North/Arid",
+    "Garissa": "North/Arid", "Isiolo": "North/Arid", "Samburu": "North/Arid",
+    # Rift Valley
+    "Elgeyo Marakwet": "Rift Valley", "West Pokot": "Rift Valley", "Baringo": "Rift Valley",
+    "Narok": "Rift Valley", "Laikipia": "Rift Valley", "Nakuru": "Rift Valley", "Kajiado": "Rift Valley",
+    "Kericho": "Rift Valley", "Bomet": "Rift Valley", "Nandi": "Rift Valley", "Uasin Gishu": "Rift Valley",
+    "Trans Nzoia": "Rift Valley",
+    # Central / East
+    "Kiambu": "Central/East", "Murang'a": "Central/East", "Nyeri": "Central/East", "Kirinyaga": "Central/East",
+    "Nyandarua": "Central/East", "Meru": "Central/East", "Tharaka Nithi": "Central/East", "Embu": "Central/East",
+    "Kitui": "Central/East", "Machakos": "Central/East", "Makueni": "Central/East",
+    # Coast
+    "Mombasa": "Coast", "Kilifi": "Coast", "Kwale": "Coast", "Tana River": "Coast", "Lamu": "Coast",
+    "Taita Taveta": "Coast",
+}
+
+SIGN_CATEGORIES = [
+    ("Rain (Ants/Frogs/Halo/Baobab)", "Rain Sign (Ants/Frogs)"),
+    ("Drought (Intestines/Mist/Dragonfly)", "Drought Sign (Intestines/Mist)"),
+    ("Landslide (Cracks/Magungu Bird)", "Landslide Sign (Cracks/Birds)"),
+]
+
+# =========================================================
+# 1. THE MENU TREE
+# =========================================================
+class Screen:
+    """One prerendered USSD screen: the exact response text plus {input: next node}."""
+    __slots__ = ("text", "options")
+
+    def __init__(self, text, options=None):
+        self.text = text
+        self.options = options or {}
+
+class ZoneResult:
+    """Leaf that needs live data, rendered per request from the conditions snapshot."""
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+def paginate(title, items, limit=USSD_MAX_CHARS):
     """
-    Parses the USSD 'text' string and matches inputs to our National Risk Database.
-    Now supports Drill-Down Menus for 26 Zones.
+    items: [(label, child)] -> first page Screen.
+    Fills each page up to the USSD limit; "98" goes to the next page, "0" goes back.
+    """
+    header = f"CON {title}\n"
+    pages = []
+    i = 0
+    while i < len(items) or not pages:
+        lines, options = [], {}
+        while i < len(items):
+            line = f"{len(lines) + 1}. {items[i][0]}"
+            more = i + 1 < len(items)
+            footer = f"\n{MORE}. More\n{BACK}. Back" if more else f"\n{BACK}. Back"
+            if lines and len(header) + len("\n".join(lines + [line])) + len(footer) > limit:
+                break
+            lines.append(line[:limit - len(header) - len(footer)])
+            options[str(len(lines))] = items[i][1]
+            i += 1
+        pages.append((lines, options))
+
+    # Build back to front so every page can point at the next one
+    nxt = None
+    for lines, options in reversed(pages):
+        footer = [f"{MORE}. More"] if nxt else []
+        footer.append(f"{BACK}. Back")
+        if nxt:
+            options[MORE] = nxt
+        nxt = Screen(header + "\n".join(lines + footer), options)
+    return nxt
+
+def group_zones(zones):
+    """{region: [zone names]} in menu order, empty regions dropped."""
+    grouped = {region: [] for region in REGIONS}
+    for zone in zones:
+        grouped[COUNTY_REGIONS.get(zone["county"], "Other")].append(zone["name"])
+    return {region: sorted(names) for region, names in grouped.items() if names}
+
+def build_menu_tree(zones):
+    """Root Screen for the whole session, built once from the zone list."""
+    regions = group_zones(zones)
+
+    # PATH 1: ASILI SMART (Indigenous Reporting) - every answer is known ahead of time
+    sign_items = []
+    for label, report_name in SIGN_CATEGORIES:
+        received = [
+            (region, Screen(
+                f"END Report Received: {report_name} in {region}.\n"
+                "Validation: Cross-referencing with Satellite Data...\n"
+                "Thank you for contributing to the National Knowledge Base."
+            ))
+            for region in regions
+        ]
+        sign_items.append((label, paginate("Select Your Location:", received)))
+
+    # PATH 2: GET FORECAST (Region -> Zone -> live result)
+    region_items = [
+        (f"{region} ({len(names)})",
+         paginate(f"Select {region} Zone:", [(name, ZoneResult(name)) for name in names]))
+        for region, names in regions.items()
+    ]
+
+    return Screen(
+        "CON Jambo Clifford! Welcome to GeoGuard.\n"
+        "1. Report Asili Sign (Citizen)\n"
+        "2. Get Warning (Forecast)",
+        {
+            "1": paginate("What sign did you observe?", sign_items),
+            "2": paginate("Select Region to Monitor:", region_items),
+        },
+    )
+
+_tree = None
+_tree_version = None
+_tree_lock = threading.Lock()
+
+def get_menu_tree():
+    """The compiled tree, rebuilt only when the zone registry changes."""
+    global _tree, _tree_version
+    zones = zone_registry.zones()
+    with _tree_lock:
+        if _tree is None or _tree_version != zone_registry.version:
+            _tree = build_menu_tree(zones)
+            _tree_version = zone_registry.version
+            print(f"📟 USSD menu rebuilt for {len(zones)} zones.")
+        return _tree
+
+def walk(root, inputs):
+    """Follows the dialled inputs through the tree (one dict lookup per hop). None = invalid."""
+    stack = [root]
+    for key in inputs:
+        if key == BACK and len(stack) > 1:
+            stack.pop()
+            continue
+        node = stack[-1]
+        nxt = node.options.get(key) if isinstance(node, Screen) else None
+        if nxt is None:
+            return None
+        stack.append(nxt)
+    return stack[-1]
+
+# =========================================================
+# 2. THE SESSION HANDLER
+# =========================================================
+def zone_result(city_name, snapshot):
+    # 1. Fetch latest log (from the in-memory snapshot the endpoint loaded)
+    log = snapshot.get(city_name)
+    if not log:
+        return f"END No live data for {city_name} yet. Try syncing."
+
+    # 2. Status precomputed by the shared rules engine (per zone hazard type)
+    status = zone_status(city_name, snapshot)["label"]
+    time_str = log.timestamp.strftime("%H:%M")
+
+    response = f"END {city_name} ({time_str}):\n"
+    response += f"🌡 {log.temperature}°C | 🌧 {log.rainfall_1h}mm\n"
+    response += f"📢 {status}"
+    return response
+
+def handle_ussd_session(text: str, snapshot: ConditionsSnapshot):
+    """
+    Parses the USSD 'text' string (e.g. "2*3*1") and walks the prerendered menu tree.
+    Every zone in risk_zones is reachable; only the final forecast screen is built per request.
     """
     inputs = text.split("*") if text else []
-    response = ""
-
-    # --- SCREEN 0: MAIN MENU ---
-    # MUST start with CON
-    if text == "":
-        response = "CON Jambo Clifford! Welcome to GeoGuard.\n"
-        response += "1. Report Asili Sign (Citizen)\n"
-        response += "2. Get Warning (Forecast)"
-
-    # =========================================================
-    # PATH 1: ASILI SMART (Indigenous Reporting)
-    # =========================================================
-    elif inputs[0] == "1":
-        # Screen 1.1: Select Sign Category (Expanded from your Data)
-        if len(inputs) == 1:
-            response = "CON What sign did you observe?\n"
-            response += "1. Rain (Ants/Frogs/Halo/Baobab)\n"
-            response += "2. Drought (Intestines/Mist/Dragonfly)\n"
-            response += "3. Landslide (Cracks/Magungu Bird)"
-        
-        # Screen 1.2: Select Broad Region
-        elif len(inputs) == 2:
-            response = "CON Select Your Location:\n"
-            response += "1. Nairobi Region\n"
-            response += "2. West/Lake (Kisumu/Kisii)\n"
-            response += "3. North/Arid (Turkana/Wajir)\n"
-            response += "4. Rift Valley (Elgeyo/Baringo)\n"
-            response += "5. Coast (Tana/Kilifi)"
-            
-        # Screen 1.3: Submission & Validation
-        elif len(inputs) == 3:
-            # Map inputs to text for the report
-            sign_cat_map = {
-                "1": "Rain Sign (Ants/Frogs)", 
-                "2": "Drought Sign (Intestines/Mist)", 
-                "3": "Landslide Sign (Cracks/Birds)"
-            }
-            region_map = {
-                "1": "Nairobi", "2": "West/Lake", "3": "North/Arid", 
-                "4": "Rift Valley", "5": "Coast"
-            }
-            
-            chosen_sign = sign_cat_map.get(inputs[1], "Unknown Sign")
-            chosen_loc = region_map.get(inputs[2], "Unknown Region")
-            
-            # Logic: Fake Validation Message
-            response = f"END Report Received: {chosen_sign} in {chosen_loc}.\n"
-            response += "Validation: Cross-referencing with Satellite Data...\n"
-            response += "Thank you for contributing to the National Knowledge Base."
-
-    # =========================================================
-    # PATH 2: GET FORECAST (The "Drill-Down" Logic)
-    # =========================================================
-    elif inputs[0] == "2":
-        # Screen 2.1: Select Region (Level 1)
-        if len(inputs) == 1:
-            response = "CON Select Region to Monitor:\n"
-            response += "1. Nairobi (Urban Flood)\n"
-            response += "2. West/Lake (Backflow)\n"
-            response += "3. North (Drought)\n"
-            response += "4. Rift (Landslide)\n"
-            response += "5. Coast (Riverine)"
-
-        # Screen 2.2: Select Specific Zone (Level 2 - Dynamic)
-        elif len(inputs) == 2:
-            region_selection = inputs[1]
-            
-            if region_selection == "1": # Nairobi
-                response = "CON Select Nairobi Zone:\n"
-                response += "1. Mathare Settlements\n"
-                response += "2. Eastlands\n"
-                response += "3. South C"
-            elif region_selection == "2": # West
-                response = "CON Select West Zone:\n"
-                response += "1. Kisumu Central\n"
-                response += "2. Homa Bay Shores\n"
-                response += "3. Kisii Highlands"
-            elif region_selection == "3": # North
-                response = "CON Select North Zone:\n"
-                response += "1. Turkana North (Kibish)\n"
-                response += "2. Mandera East\n"
-                response += "3. Wajir South"
-            elif region_selection == "4": # Rift
-                response = "CON Select Rift Zone:\n"
-                response += "1. Chesongoch (Elgeyo)\n"
-                response += "2. Weiwei (West Pokot)\n"
-                response += "3. Narok West"
-            elif region_selection == "5": # Coast
-                response = "CON Select Coast Zone:\n"
-                response += "1. Hola (Tana River)\n"
-                response += "2. Mombasa Island\n"
-                response += "3. Ganze (Kilifi)"
-            else:
-                response = "END Invalid Region."
-
-        # Screen 2.3: Fetch Data (Level 3 - The Result)
-        elif len(inputs) == 3:
-            region = inputs[1]
-            zone = inputs[2]
-            
-            # HUGE MAPPING: Maps (Region, Zone) -> Exact DB Name
-            # This matches the names in your new 'seed_db.py' data
-            db_mapping = {
-                ("1", "1"): "Mathare Settlements", ("1", "2"): "Eastlands", ("1", "3"): "South C",
-                ("2", "1"): "Kisumu Central", ("2", "2"): "Homa Bay Shores", ("2", "3"): "Kisii Highlands",
-                ("3", "1"): "Turkana North (Kibish)", ("3", "2"): "Mandera East", ("3", "3"): "Wajir South",
-                ("4", "1"): "Chesongoch", ("4", "2"): "Weiwei", ("4", "3"): "Narok West",
-                ("5", "1"): "Hola", ("5", "2"): "Mombasa Island", ("5", "3"): "Ganze"
-            }
-            
-            city_name = db_mapping.get((region, zone))
-            
-            if city_name:
-                # 1. Fetch latest log
-                log = db.query(WeatherLog).filter(WeatherLog.city == city_name).order_by(WeatherLog.timestamp.desc()).first()
-                
-                if log:
-                    # 2. Smart Status Logic based on Risk Type
-                    status = "Normal"
-                    
-                    # Customize Warning based on Region Type
-                    if region == "3": # North (Drought logic)
-                        if log.temperature > 30 and log.rainfall_1h < 1: status = "☀️ ALERT: DROUGHT"
-                    elif region == "4": # Rift (Landslide logic)
-                        if log.rainfall_1h > 15: status = "⛰️ ALERT: LANDSLIDE"
-                    else: # Flood logic (General)
-                        if log.rainfall_1h > 10: status = "⚠️ ALERT: FLOOD"
-
-                    time_str = log.timestamp.strftime("%H:%M")
-
-                    response = f"END {city_name} ({time_str}):\n"
-                    response += f"🌡 {log.temperature}°C | 🌧 {log.rainfall_1h}mm\n"
-                    response += f"📢 {status}"
-                else:
-                    response = f"END No live data for {city_name} yet. Try syncing."
-            else:
-                response = "END Invalid Zone Selection."
-
-    else:
-        response = "END Invalid Input."
-
-    return response
\ No newline at end of file
+    node = walk(get_menu_tree(), inputs)
+
+    if node is None:
+        return "END Invalid Input."
+    if isinstance(node, ZoneResult):
+        return zone_result(node.name, snapshot)
+    return node.text
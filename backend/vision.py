@@ -0,0 +1,166 @@
+# backend/vision.py
+import os
+import time
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from PIL import Image
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# "gemini" in production, "fake" for local runs and tests (no API calls)
+VISION_MODEL = os.getenv("VISION_MODEL", "gemini")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+
+# --- ANALYSIS CACHE SETTINGS ---
+VISION_CACHE_SIZE = int(os.getenv("VISION_CACHE_SIZE", "512"))
+VISION_CACHE_TTL = float(os.getenv("VISION_CACHE_TTL", str(6 * 3600)))
+# Max differing bits (out of 64) for two photos to count as the same picture
+VISION_HASH_DISTANCE = int(os.getenv("VISION_HASH_DISTANCE", "6"))
+
+PROMPT = "Analyze this image for Kenyan climate risks (Flood, Drought, Landslide). Be brief. If safe, say 'Safe'."
+
+# =========================================================
+# 1. THE MODEL INTERFACE
+# =========================================================
+class VisionModel(ABC):
+    """Anything that turns an image (compact JPEG bytes) into a short risk verdict."""
+
+    @abstractmethod
+    def analyze(self, image_bytes):
+        ...
+
+class GeminiVisionModel(VisionModel):
+    """One genai.Client for the whole process (it keeps its own HTTP connection pool)."""
+
+    def __init__(self, model=GEMINI_MODEL):
+        self.model = model
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                from google import genai
+                self._client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"), http_options={'api_version': 'v1beta'})
+            return self._client
+
+    def analyze(self, image_bytes):
+        from google.genai import types
+        image = types.Part.from_bytes(data=image_bytes, mime_type="image/jpeg")
+        return self.client.models.generate_content(model=self.model, contents=[image, PROMPT]).text
+
+class FakeVisionModel(VisionModel):
+    """Local stand-in: returns a fixed verdict and counts calls."""
+
+    def __init__(self, verdict="✅ Area appears Safe"):
+        self.verdict = verdict
+        self.calls = 0
+
+    def analyze(self, image_bytes):
+        self.calls += 1
+        return self.verdict
+
+_model = None
+_model_lock = threading.Lock()
+
+def get_vision_model():
+    global _model
+    with _model_lock:
+        if _model is None:
+            _model = FakeVisionModel() if VISION_MODEL == "fake" else GeminiVisionModel()
+        return _model
+
+def set_vision_model(model):
+    """Swap the model (e.g. a FakeVisionModel in tests)."""
+    global _model
+    with _model_lock:
+        _model = model
+
+# =========================================================
+# 2. PERCEPTUAL HASH + CACHE
+# =========================================================
+def dhash(image, size=8):
+    """
+    64-bit difference hash: survives re-compression, resizing and small edits,
+    which is exactly what happens to a photo forwarded around WhatsApp groups.
+    """
+    gray = image.convert("L").resize((size + 1, size), Image.LANCZOS)
+    pixels = list(gray.getdata())
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return bits
+
+class AnalysisCache:
+    """LRU + TTL cache of verdicts keyed by perceptual hash, with near-duplicate matching."""
+
+    def __init__(self, max_entries=VISION_CACHE_SIZE, ttl=VISION_CACHE_TTL, max_distance=VISION_HASH_DISTANCE):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self._entries = OrderedDict()   # hash -> (verdict, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            # Drop expired entries first (oldest are at the front)
+            for k in [k for k, (_, exp) in self._entries.items() if exp <= now]:
+                del self._entries[k]
+
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+
+            # Near-duplicate: same picture, slightly different bytes
+            for k, (verdict, _) in self._entries.items():
+                if bin(k ^ key).count("1") <= self.max_distance:
+                    self._entries.move_to_end(k)
+                    self.near_hits += 1
+                    return verdict
+
+            self.misses += 1
+            return None
+
+    def put(self, key, verdict):
+        with self._lock:
+            self._entries[key] = (verdict, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.near_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.near_hits) / lookups, 3) if lookups else 0.0,
+            }
+
+# Shared instance for the whole process
+analysis_cache = AnalysisCache()
+
+def analyze_image_cached(image_bytes, key):
+    """
+    image_bytes: preprocessed JPEG, key: its dhash (see backend/media.py).
+    Returns (verdict, from_cache). Only cache misses reach the model.
+    """
+    verdict = analysis_cache.get(key)
+    if verdict is not None:
+        return verdict, True
+    verdict = get_vision_model().analyze(image_bytes)
+    analysis_cache.put(key, verdict)
+    return verdict, False
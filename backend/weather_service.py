@@ -1,152 +1,166 @@
 # backend/weather_service.py
 import os
+import math
+import threading
 import requests
 import datetime
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from sqlalchemy.orm import Session
 from backend.database import SessionLocal
-from backend.models import RiskZone, WeatherLog
+from backend.zone_registry import zone_registry
+from backend.ingest import bulk_insert_weather_logs
+from backend.conditions_cache import latest_conditions
+from backend.alert_engine import process_alerts
 from dotenv import load_dotenv
 
 # Load API Key
 load_dotenv()
 API_KEY = os.getenv("OPENWEATHER_API_KEY")
+BASE_URL = "https://api.openweathermap.org/data/2.5/weather"
 
-def fetch_live_weather():
+# --- SCAN ENGINE SETTINGS ---
+# How many zones we ping at the same time (1 = old one-by-one behaviour)
+SCAN_CONCURRENCY = int(os.getenv("SCAN_CONCURRENCY", "16"))
+REQUEST_TIMEOUT = float(os.getenv("SCAN_TIMEOUT", "10"))
+# Zones inside the same grid cell share one API call (0.05° ≈ 5.5km, 0 = off)
+SCAN_GRID_DEG = float(os.getenv("SCAN_GRID_DEG", "0.05"))
+
+# One shared keep-alive pool, so every zone doesn't pay for a new TCP/TLS handshake
+_http = requests.Session()
+_http.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=max(SCAN_CONCURRENCY, 10)))
+
+def fetch_zone_weather(lat, lon):
+    """Calls OpenWeatherMap for one coordinate using the shared connection pool."""
+    params = {"lat": lat, "lon": lon, "appid": API_KEY, "units": "metric"}
+    return _http.get(BASE_URL, params=params, timeout=REQUEST_TIMEOUT).json()
+
+def scan_zones(targets, concurrency=None):
     """
-    1. Gets all RiskZones from DB.
-    2. Pings OpenWeatherMap for each zone.
-    3. Saves the new data to WeatherLog table.
+    Fetches weather for many (name, lat, lon) targets in parallel.
+    Returns a list of (name, lat, lon, response_or_exception) in the same order.
     """
-    if not API_KEY:
-        print("❌ Error: OPENWEATHER_API_KEY not found in .env")
-        return
+    workers = max(1, min(concurrency or SCAN_CONCURRENCY, len(targets) or 1))
 
-    db = SessionLocal()
-    zones = db.query(RiskZone).all()
-    
-    if not zones:
-        print("⚠️ No zones found in DB. Did you run the seed script?")
-        return
+    def _fetch(target):
+        name, lat, lon = target
+        try:
+            return name, lat, lon, fetch_zone_weather(lat, lon)
+        except Exception as e:
+            return name, lat, lon, e
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="weather-scan") as pool:
+        return list(pool.map(_fetch, targets))
+
+def plan_scan(zones, grid_deg=None):
+    """
+    Groups zones that share a grid cell so each cell is fetched only once.
+    Returns {cell_key: {"lat", "lon", "zones": [...]}} where lat/lon is the cell centre.
+    grid_deg <= 0 turns deduplication off (one call per zone).
+    """
+    grid = SCAN_GRID_DEG if grid_deg is None else grid_deg
+    cells = {}
+    for z in zones:
+        if grid > 0:
+            row, col = math.floor(z["lat"] / grid), math.floor(z["lon"] / grid)
+            key = f"{row}:{col}"
+            lat, lon = round((row + 0.5) * grid, 4), round((col + 0.5) * grid, 4)
+        else:
+            key, lat, lon = z["name"], z["lat"], z["lon"]
+        cell = cells.setdefault(key, {"lat": lat, "lon": lon, "zones": []})
+        cell["zones"].append(z)
+    return cells
+
+# The startup scan, adaptive ticks and the dashboard's refresh can overlap: one scan at a time,
+# otherwise two runs may insert the same new ZoneAlertState row
+_scan_lock = threading.Lock()
+
+def run_scan(zones, concurrency=None, grid_deg=None):
+    """
+    Fetches, stores and caches fresh readings for the given zones (dicts from the zone registry).
+    Returns the list of observations that were saved.
+    """
+    with _scan_lock:
+        return _run_scan(zones, concurrency, grid_deg)
+
+def _run_scan(zones, concurrency, grid_deg):
+    # 1. Coordinates were derived from each zone's polygon when it was added
+    for z in zones:
+        if z["lat"] is None:
+            print(f"   ⚠️ Skipping {z['name']}: no geometry to place it on the map.")
+    zones = [z for z in zones if z["lat"] is not None]
+
+    # 2. Nearby zones share one API call per grid cell
+    cells = plan_scan(zones, grid_deg)
+    print(f"   🧭 {len(zones)} zones -> {len(cells)} API calls.")
+
+    # 3. Call API (concurrently)
+    results = scan_zones([(key, c["lat"], c["lon"]) for key, c in cells.items()], concurrency)
+
+    observations = []
+    scan_time = datetime.datetime.now()
+    for key, _, _, res in results:
+        names = ", ".join(z["name"] for z in cells[key]["zones"])
+        if isinstance(res, Exception):
+            print(f"   ❌ Error fetching {names}: {res}")
+            continue
 
-    print(f"🌍 Starting Weather Scan for {len(zones)} zones...")
-    
-    count = 0
-    for zone in zones:
-        # 1. Get Coordinates based on the specific Zone Name
-        lat, lon = get_coords(zone.name)
-        
         try:
-            # 2. Call API
-            url = f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={API_KEY}&units=metric"
-            res = requests.get(url, timeout=10).json()
-            
-            # 3. Validate Response
+            # 4. Validate Response
             if res.get("cod") != 200:
-                print(f"⚠️ API Error for {zone.name}: {res.get('message')}")
+                print(f"⚠️ API Error for {names}: {res.get('message')}")
                 continue
 
             # Rain is often missing from API if it's 0, so we default to 0.0
             rain_1h = res.get("rain", {}).get("1h", 0.0)
             
-            # 4. Save to DB
-            new_log = WeatherLog(
-                city=zone.name,
-                temperature=res["main"]["temp"],
-                humidity=res["main"]["humidity"],
-                rainfall_1h=rain_1h,
-                lat=lat,
-                lon=lon,
-                timestamp=datetime.datetime.now()
-            )
-            db.add(new_log)
-            count += 1
-            print(f"   ✅ {zone.name}: {res['main']['temp']}°C, {rain_1h}mm Rain")
+            # 5. Fan the reading out to every zone in the cell
+            for z in cells[key]["zones"]:
+                observations.append({
+                    "city": z["name"],
+                    "temperature": res["main"]["temp"],
+                    "humidity": res["main"]["humidity"],
+                    "rainfall_1h": rain_1h,
+                    "lat": z["lat"],
+                    "lon": z["lon"],
+                    "timestamp": scan_time
+                })
+            print(f"   ✅ {names}: {res['main']['temp']}°C, {rain_1h}mm Rain")
             
         except Exception as e:
-            print(f"   ❌ Error fetching {zone.name}: {e}")
+            print(f"   ❌ Error parsing {names}: {e}")
 
-    db.commit()
-    db.close()
-    print(f"🚀 Scan Complete. Added {count} new weather logs.")
+    # 6. Save to DB (one bulk write instead of one ORM object per zone)
+    db = SessionLocal()
+    try:
+        bulk_insert_weather_logs(db, observations)
+        db.commit()
+        # Swap the USSD/WhatsApp cache to the new readings, classify them once
+        # and record any alert transitions
+        process_alerts(db, latest_conditions.refresh(db))
+    finally:
+        db.close()
+    return observations
 
-def get_coords(zone_name):
+def fetch_live_weather(concurrency=None):
     """
-    Maps the exact Zone Names from seed_db.py to real-world coordinates.
+    1. Gets all RiskZones (with their cached coordinates) from the zone registry.
+    2. Pings OpenWeatherMap once per grid cell, in parallel (bounded by SCAN_CONCURRENCY).
+    3. Saves the new data to WeatherLog table.
     """
-    locations = {
-        # --- Nairobi & Urban ---
-        "Mathare Settlements": (-1.26, 36.85),
-        "Eastlands": (-1.28, 36.89),
-        "South C": (-1.32, 36.83),
-        "Kibera (Soweto Highrise)": (-1.31, 36.79),
-        "Dagoretti Corner": (-1.30, 36.76),
-        "Westlands": (-1.27, 36.81),
-        "Kasarani": (-1.21, 36.92),
-        "Embakasi": (-1.30, 36.95),
-        "Langata": (-1.35, 36.75),
-        "Ruiru": (-1.15, 36.95),
-        "Thika": (-1.03, 37.07),
-        "Juja": (-1.18, 37.05),
-        "Kiambu Town": (-1.17, 36.83),
-        "Githurai": (-1.15, 36.90),
-        "Kahawa West": (-1.20, 36.90),
-        "Kawangware": (-1.28, 36.75),
-        
-        # --- Lake Region ---
-        "Kisumu Central": (-0.10, 34.75),
-        "Dunga Beach": (-0.14, 34.73),
-        "Homa Bay Shores": (-0.52, 34.45),
-        "Budalangi Floodplains": (0.10, 34.00),
-        "Kisii Highlands": (-0.68, 34.77),
-        "Migori Town": (-1.06, 34.48),
-        "Rongo": (-0.83, 34.45),
-
-        
-        # --- Rift Valley & Central ---
-        "Mai Mahiu Gully": (-0.99, 36.56),
-        "Murang'a East Slopes": (-0.72, 37.15),
-        "Laikipia Dam Zone": (0.36, 36.78),
-        "Tiaty": (1.00, 36.10),
-        "Narok West": (-1.20, 35.50),
-        "Weiwei": (1.45, 35.45),
-        "Chesongoch": (1.13, 35.64),
-        "Elgeyo Escarpment": (0.85, 35.50),
-        "Kericho Tea Zone": (-0.37, 35.28),
-        "Bomet Lowlands": (-0.80, 35.30),
-        "Nakuru Town": (-0.28, 36.07),
-        "Naivasha Lakeside": (-0.72, 36.43),
-        "Eldoret Industrial": (0.52, 35.27),
-        
-        # --- ASAL & North ---
-        "Turkana North (Kibish)": (4.50, 35.80),
-        "Turkana Central": (3.11, 35.60),
-        "Lobere Dam Area": (3.58, 36.12),
-        "Mandera East": (3.93, 41.86),
-        "Wajir South": (1.00, 40.00),
-        "Marsabit North": (3.00, 37.50),
-        "Garissa North": (-0.10, 39.50),
-        "Shimbirey": (-0.42, 39.63),
-        "Isiolo": (0.35, 37.58),
-        "Samburu East": (1.20, 37.20),
-        "Kitui Central": (-1.35, 38.00),
-        "Makueni North": (-1.50, 37.70),
-        "Kitui South": (-1.60, 38.20),
-        "Machakos Town": (-1.50, 37.25),
-        "Kajiado Central": (-1.85, 36.80),
-        
-        # --- Coastal ---
-        "Hola": (-1.50, 40.03),
-        "Kwale Hinterland": (-4.17, 39.45),
-        "Ganze": (-3.50, 39.75),
-        "Taita Taveta Hills": (-3.40, 38.50),
-        "Mombasa Island": (-4.05, 39.66),
-        "Likoni": (-4.10, 39.65),
-        "Malindi": (-3.22, 40.12),
-        "Kilifi Town": (-3.63, 39.85),
-        
-    }
-    # Default to Nairobi if name doesn't match
-    return locations.get(zone_name, (-1.29, 36.82))
+    if not API_KEY:
+        print("❌ Error: OPENWEATHER_API_KEY not found in .env")
+        return
+
+    zones = zone_registry.zones()
+    
+    if not zones:
+        print("⚠️ No zones found in DB. Did you run the seed script?")
+        return
+
+    print(f"🌍 Starting Weather Scan for {len(zones)} zones...")
+    observations = run_scan(zones, concurrency)
+    print(f"🚀 Scan Complete. Added {len(observations)} new weather logs.")
 
 if __name__ == "__main__":
     fetch_live_weather()
\ No newline at end of file
@@ -1,19 +1,25 @@
 # backend/whatsapp_service.py
 import os
-import requests
 import random
+from concurrent.futures import ThreadPoolExecutor
 from twilio.twiml.messaging_response import MessagingResponse
-from google import genai
-from PIL import Image
-from io import BytesIO
 from dotenv import load_dotenv
 
-# DB Imports
-from backend.database import SessionLocal
-from backend.models import WeatherLog
+# Live data (cached per scan)
+from backend.conditions_cache import latest_conditions
+from backend.spatial import zone_index
+from backend.risk_rules import zone_status
+from backend.messaging import get_sender
+from backend.vision import analyze_image_cached
+from backend.media import download_media, preprocess_image, MediaTooLarge
+from backend.intent import get_matcher
 
 load_dotenv()
 
+# Photo analysis runs here, never on the webhook's event loop
+VISION_WORKERS = int(os.getenv("VISION_WORKERS", "4"))
+_vision_pool = ThreadPoolExecutor(max_workers=VISION_WORKERS, thread_name_prefix="vision")
+
 # --- 1. SMART LOCATION MAPPING (Connects User Input -> DB Names) ---
 # This dictionary maps "What users type" to "Exact DB Name"
 ZONE_MAP = {
@@ -60,68 +66,94 @@ IK_SIGNS = {
     "bird": "🦅 *Magungu Bird High*\nMeaning: Heavy rain approaching."
 }
 
+# Swahili / alternative names for the signs above
+IK_SIGN_ALIASES = {"siafu": "ants", "safari ants": "ants", "mbuyu": "baobab", "magungu": "bird"}
+
+def intent_matcher():
+    """Compiled zone + sign matcher (rebuilt automatically when zones change)."""
+    signs = {**{key: key for key in IK_SIGNS}, **IK_SIGN_ALIASES}
+    return get_matcher(ZONE_MAP, signs)
+
 def get_live_forecast(user_text):
     """
     Finds the correct zone and returns a detailed report.
     """
-    # 1. Find the best match
-    db_name = None
-    for keyword, name in ZONE_MAP.items():
-        if keyword in user_text:
-            db_name = name
-            break
+    # 1. Find the best match (longest keyword wins, typos tolerated)
+    match = intent_matcher().best(user_text, "zone")
     
-    if not db_name:
+    if not match:
         return None  # No match found
 
-    # 2. Query DB
-    db = SessionLocal()
+    return get_zone_report(match.value)
+
+def get_zone_report(db_name):
+    """Builds the live status message for one exact zone name."""
+    # Latest reading (in-memory cache, refreshed by every scan)
+    log = latest_conditions.get(db_name)
+    
+    if log:
+        # Status precomputed by the shared rules engine
+        status = zone_status(db_name)["label"]
+
+        return (f"🌍 *Live Monitor: {db_name}*\n"
+                f"🌡 Temp: {log.temperature}°C\n"
+                f"💧 Rain (1h): {log.rainfall_1h}mm\n"
+                f"📢 Status: {status}\n"
+                f"_(Synced: {log.timestamp.strftime('%H:%M')})_")
+    else:
+        return f"⚠️ Connected to {db_name}, but waiting for fresh sensor data. Try syncing."
+
+def analyze_image(media_url):
+    """Downloads a photo and asks the vision model for a risk verdict (blocking, runs on a worker)."""
     try:
-        log = db.query(WeatherLog).filter(WeatherLog.city == db_name).order_by(WeatherLog.timestamp.desc()).first()
+        # Download (streamed, size-capped) & Process (decode/orient/downsample in a worker process)
+        img_data = download_media(media_url, auth=(os.getenv("TWILIO_ACCOUNT_SID"), os.getenv("TWILIO_AUTH_TOKEN")))
+        jpeg, phash = preprocess_image(img_data)
         
-        if log:
-            # Smart Status Logic
-            status = "🟢 Normal"
-            if log.rainfall_1h > 50: status = "🚨 CRITICAL RISK"
-            elif log.rainfall_1h > 10: status = "⚠️ Warning Alert"
-            elif log.temperature > 34: status = "☀️ Severe Heat/Drought"
-
-            return (f"🌍 *Live Monitor: {db_name}*\n"
-                    f"🌡 Temp: {log.temperature}°C\n"
-                    f"💧 Rain (1h): {log.rainfall_1h}mm\n"
-                    f"📢 Status: {status}\n"
-                    f"_(Synced: {log.timestamp.strftime('%H:%M')})_")
-        else:
-            return f"⚠️ Connected to {db_name}, but waiting for fresh sensor data. Try syncing."
-    finally:
-        db.close()
+        # Shared model client + perceptual-hash cache (forwarded copies of a photo are answered instantly)
+        verdict, cached = analyze_image_cached(jpeg, phash)
+        if cached:
+            print("   ♻️ Vision verdict served from cache.")
+        return f"🤖 *GeoGuard Vision*\n\n{verdict}"
+
+    except MediaTooLarge as e:
+        print(f"⚠️ Photo rejected: {e}")
+        return "⚠️ That photo is too large to analyse. Please send a smaller picture."
+
+    except Exception as e:
+        # Fallback Demo Mode
+        print(f"⚠️ AI Backup Triggered: {e}")
+        risks = ["⚠️ *High Flood Risk Detected*", "☀️ *Severe Drought Stress Visible*", "✅ *Area appears Safe*"]
+        return f"🤖 *GeoGuard Vision (Offline)*\n\n{random.choice(risks)}\n_Note: Live AI is reconnecting._"
+
+def _analyze_and_reply(media_url, sender):
+    try:
+        get_sender().send(sender, analyze_image(media_url))
+    except Exception as e:
+        print(f"❌ Could not deliver vision result to {sender}: {e}")
 
-def handle_whatsapp_message(body: str, media_url: str, sender: str):
+def handle_whatsapp_message(body: str, media_url: str, sender: str, location=None):
     response = MessagingResponse()
     msg = response.message()
 
     # --- SCENARIO 1: IMAGE ANALYSIS (Visual AI) ---
+    # Acknowledge right away, the analysis runs on a worker and replies as an outbound message
     if media_url:
-        print(f"📸 Image received from {sender}! Analyzing...")
-        try:
-            # Download & Process
-            img_data = requests.get(media_url, auth=(os.getenv("TWILIO_ACCOUNT_SID"), os.getenv("TWILIO_AUTH_TOKEN"))).content
-            image = Image.open(BytesIO(img_data))
-            
-            # Setup Client (Free Tier Friendly)
-            client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"), http_options={'api_version': 'v1beta'})
-            prompt = "Analyze this image for Kenyan climate risks (Flood, Drought, Landslide). Be brief. If safe, say 'Safe'."
-            
-            ai_response = client.models.generate_content(model="gemini-2.0-flash", contents=[image, prompt])
-            msg.body(f"🤖 *GeoGuard Vision*\n\n{ai_response.text}")
-
-        except Exception as e:
-            # Fallback Demo Mode
-            print(f"⚠️ AI Backup Triggered: {e}")
-            risks = ["⚠️ *High Flood Risk Detected*", "☀️ *Severe Drought Stress Visible*", "✅ *Area appears Safe*"]
-            msg.body(f"🤖 *GeoGuard Vision (Offline)*\n\n{random.choice(risks)}\n_Note: Live AI is reconnecting._")
-
-    # --- SCENARIO 2: TEXT INTELLIGENCE ---
+        print(f"📸 Image received from {sender}! Queued for analysis...")
+        _vision_pool.submit(_analyze_and_reply, media_url, sender)
+        msg.body("📸 *Photo received!*\nGeoGuard Vision is analysing it, you'll get the result here shortly.")
+
+    # --- SCENARIO 2: SHARED LOCATION PIN ---
+    elif location:
+        matches = zone_index.find_zones(*location)
+        if matches:
+            zone = matches[0]
+            note = "" if zone["match"] == "inside" else f"\n_(Nearest zone, {zone['distance_km']}km away)_"
+            msg.body(get_zone_report(zone["name"]) + note)
+        else:
+            msg.body("⚠️ No monitored risk zone found near that location.")
+
+    # --- SCENARIO 3: TEXT INTELLIGENCE ---
     else:
         text = body.lower().strip()
         
@@ -136,20 +168,13 @@ def handle_whatsapp_message(body: str, media_url: str, sender: str):
                      "• Send a *Photo* for analysis")
 
         # 2. Check for Location Requests (The "26 Zone" Logic)
-        elif any(k in text for k in ZONE_MAP.keys()):
-            report = get_live_forecast(text)
-            if report:
-                msg.body(report)
-            else:
-                msg.body("⚠️ I recognize that region, but need more specific details.")
+        elif (zone := intent_matcher().best(text, "zone")):
+            msg.body(get_zone_report(zone.value))
 
         # 3. Check for Indigenous Knowledge (The "Asili Smart" Logic)
-        elif any(k in text for k in IK_SIGNS.keys()):
-            # Find which sign they mentioned
-            for key, explanation in IK_SIGNS.items():
-                if key in text:
-                    msg.body(f"🌿 *Asili Smart Knowledge*\n\n{explanation}\n\n_System has logged this observation._")
-                    break
+        elif (sign := intent_matcher().best(text, "sign")):
+            explanation = IK_SIGNS[sign.value]
+            msg.body(f"🌿 *Asili Smart Knowledge*\n\n{explanation}\n\n_System has logged this observation._")
 
         # 4. Fallback
         else:
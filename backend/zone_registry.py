@@ -0,0 +1,81 @@
+# backend/zone_registry.py
+import os
+import time
+import threading
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from backend.database import SessionLocal
+from backend.models import RiskZone
+
+# Zones change rarely (seed / GeoJSON import), so re-read them every few minutes at most
+ZONE_REGISTRY_TTL = float(os.getenv("ZONE_REGISTRY_TTL", "600"))
+
+def ensure_zone_columns(db: Session):
+    """
+    Adds the centroid columns to older databases and fills any that are missing
+    with ST_PointOnSurface (always inside the polygon, unlike a plain centroid).
+    """
+    db.execute(text("ALTER TABLE risk_zones ADD COLUMN IF NOT EXISTS centroid_lat DOUBLE PRECISION"))
+    db.execute(text("ALTER TABLE risk_zones ADD COLUMN IF NOT EXISTS centroid_lon DOUBLE PRECISION"))
+    filled = db.execute(text("""
+        UPDATE risk_zones
+        SET centroid_lat = ST_Y(ST_PointOnSurface(geom)), centroid_lon = ST_X(ST_PointOnSurface(geom))
+        WHERE geom IS NOT NULL AND (centroid_lat IS NULL OR centroid_lon IS NULL)
+    """)).rowcount
+    db.commit()
+    if filled:
+        print(f"📍 Computed coordinates for {filled} zone(s).")
+
+class ZoneRegistry:
+    """
+    Process-wide list of risk zones with their coordinates.
+    Ingestion and rendering read from here instead of hard-coded coordinate dictionaries.
+    """
+
+    def __init__(self, ttl=ZONE_REGISTRY_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._zones = {}
+        self._loaded_at = None
+        self.version = None
+
+    def reload(self, db: Session = None):
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            rows = db.query(
+                RiskZone.id, RiskZone.name, RiskZone.county, RiskZone.risk_level,
+                RiskZone.disaster_type, RiskZone.centroid_lat, RiskZone.centroid_lon,
+            ).order_by(RiskZone.id).all()
+        finally:
+            if own_session:
+                db.close()
+
+        zones = {
+            r.name: {
+                "id": r.id, "name": r.name, "county": r.county, "risk_level": r.risk_level,
+                "disaster_type": r.disaster_type, "lat": r.centroid_lat, "lon": r.centroid_lon,
+            }
+            for r in rows
+        }
+        with self._lock:
+            self._zones = zones
+            self._loaded_at = time.monotonic()
+            # Cheap fingerprint so dependants (menus, matchers) know when to rebuild
+            self.version = hash(tuple((z["id"], z["name"], z["county"], z["risk_level"], z["lat"], z["lon"]) for z in zones.values()))
+        return zones
+
+    def _current(self):
+        if self._loaded_at is None or (time.monotonic() - self._loaded_at) > self.ttl:
+            self.reload()
+        return self._zones
+
+    def zones(self):
+        """All zones as plain dicts (id, name, county, risk_level, disaster_type, lat, lon)."""
+        return list(self._current().values())
+
+    def get(self, name):
+        return self._current().get(name)
+
+# Shared instance for the whole process
+zone_registry = ZoneRegistry()
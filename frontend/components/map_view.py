@@ -1,71 +1,120 @@
 # frontend/components/map_view.py
+import os
+import json
 import folium
+import pandas as pd
 import streamlit as st
+from folium.plugins import FastMarkerCluster
+from sqlalchemy import text
 from backend.database import SessionLocal
-from backend.models import RiskZone, WeatherLog
-from shapely import wkb
 
-def get_db_data():
-    """Fetch all Risk Zones and the latest Weather Logs."""
-    db = SessionLocal()
-    zones = db.query(RiskZone).all()
-    # Get latest weather for each city (distinct on city)
-    weather = db.query(WeatherLog).order_by(WeatherLog.city, WeatherLog.timestamp.desc()).distinct(WeatherLog.city).all()
-    db.close()
-    return zones, weather
+# Polygon simplification tolerance (degrees) - keeps the GeoJSON payload small at national zoom
+MAP_SIMPLIFY_DEG = float(os.getenv("MAP_SIMPLIFY_DEG", "0.001"))
 
-def render_map(filter_type="All"):
-    """
-    Draws the map with Polygons (Risk Zones) and Markers (Weather).
-    filter_type: 'All', 'Flood', 'Drought', 'Landslide'
-    """
-    # 1. Base Map centered on Kenya
-    m = folium.Map(location=[0.0236, 37.9062], zoom_start=6, tiles="CartoDB dark_matter")
+# Zones shown with fake heavy rain when "SIMULATE DISASTER" is ticked
+SIMULATED_ZONES = ("Mathare", "Mai Mahiu")
+
+SEVERITY_COLORS = {3: "red", 2: "orange", 1: "blue", 0: "green"}
+
+ZONES_SQL = text("""
+    SELECT name, county, risk_level, disaster_type, description,
+           ST_AsGeoJSON(ST_SimplifyPreserveTopology(geom, :tolerance), 5) AS geometry
+    FROM risk_zones
+    WHERE geom IS NOT NULL
+    ORDER BY id
+""")
+
+# One marker per row, built in the browser (the page only carries the raw numbers)
+WEATHER_CALLBACK = """
+function (row) {
+    var icon = L.AwesomeMarkers.icon({icon: 'cloud', markerColor: row[5], prefix: 'glyphicon'});
+    var marker = L.marker(new L.LatLng(row[0], row[1]), {icon: icon});
+    marker.bindPopup('<b>' + row[2] + '</b><br>Rain: ' + row[3] + 'mm<br>' + row[4]);
+    marker.bindTooltip(row[2] + ': ' + row[3] + 'mm Rain');
+    return marker;
+};
+"""
 
-    zones, weather_logs = get_db_data()
+def zone_color(risk_level, disaster_type):
+    color = "#FFA500"                                   # Orange
+    if risk_level == "Critical": color = "#FF0000"      # Red
+    if "Drought" in (disaster_type or ""): color = "#8B4513"   # Brown
+    return color
 
-    # 2. Draw Risk Zones (Polygons)
-    for zone in zones:
-        # Filter logic
-        if filter_type != "All" and filter_type not in zone.disaster_type:
+@st.cache_data(max_entries=2, show_spinner=False)
+def get_zones_geojson(version):
+    """All risk zone polygons as one FeatureCollection, styling and popup text in the properties."""
+    with SessionLocal() as db:
+        rows = db.execute(ZONES_SQL, {"tolerance": MAP_SIMPLIFY_DEG}).all()
+
+    features = [
+        {
+            "type": "Feature",
+            "geometry": json.loads(r.geometry),
+            "properties": {
+                "name": r.name, "county": r.county, "risk_level": r.risk_level,
+                "disaster_type": r.disaster_type, "description": r.description or "",
+                "color": zone_color(r.risk_level, r.disaster_type),
+            },
+        }
+        for r in rows
+    ]
+    return {"type": "FeatureCollection", "features": features}
+
+def weather_points(weather, alerts, simulate=False):
+    """[lat, lon, city, rain, label, marker colour] per zone, coloured by its open alert."""
+    alert_by_zone = {a.city: a for a in alerts.itertuples()}
+    points = []
+    for log in weather.itertuples():
+        if pd.isna(log.lat) or pd.isna(log.lon):
             continue
+        rain = log.rainfall_1h
+        alert = alert_by_zone.get(log.city)
+        severity, label = (int(alert.severity), alert.label) if alert else (0, "🟢 Normal")
+        if simulate and any(name in log.city for name in SIMULATED_ZONES):
+            rain, severity, label = 65.0, 3, "🚨 CRITICAL: Heavy Rainfall"
+        points.append([log.lat, log.lon, log.city, rain, label, SEVERITY_COLORS[severity]])
+    return points
 
-        # Color coding
-        color = "#FF0000" if zone.risk_level == "Critical" else "#FFA500" # Red or Orange
-        
-        # Convert WKB (Database format) to GeoJSON
-        if zone.geom is not None:
-            # I use a simple popup
-            popup_html = f"""
-            <b>{zone.name}</b><br>
-            Type: {zone.disaster_type}<br>
-            Risk: {zone.risk_level}<br>
-            <i>{zone.description}</i>
-            """
-            
-            # Note: In a real app we'd convert WKB to GeoJSON properly. 
-            # For this hackathon, I used a library helper and a marker incase polygon fails.
-            pass 
+@st.cache_resource(max_entries=8, show_spinner=False)
+def render_map(version, _weather, _alerts, filter_type="All", simulate=False):
+    """
+    Draws the map with Polygons (Risk Zones) and clustered Markers (Weather).
+    version: the dashboard's data version - the map is only rebuilt when it (or the filters) change.
+    _weather / _alerts: the DataFrames that version describes (not hashed, the version stands in for them).
+    filter_type: 'All', 'Urban Flood', 'Riverine Flood', 'Landslide', 'Drought'
+    """
+    # 1. Base Map centered on Kenya
+    m = folium.Map(location=[0.0236, 37.9062], zoom_start=6, tiles="CartoDB dark_matter")
 
-    # 3. Draw Weather Markers (The Pinpoints)
-    for log in weather_logs:
-        # Determine Icon based on rain
-        icon_color = "green"
-        if log.rainfall_1h > 0: icon_color = "blue"
-        if log.rainfall_1h > 10: icon_color = "red" # Heavy rain
+    # 2. Risk Zones: a single GeoJSON layer (style and popups read from feature properties)
+    geojson = get_zones_geojson(version)
+    if filter_type != "All":
+        geojson = {
+            "type": "FeatureCollection",
+            "features": [f for f in geojson["features"] if filter_type in (f["properties"]["disaster_type"] or "")],
+        }
+    if geojson["features"]:
+        folium.GeoJson(
+            geojson,
+            name="Risk Zones",
+            style_function=lambda f: {
+                "color": f["properties"]["color"], "fillColor": f["properties"]["color"],
+                "weight": 1, "fillOpacity": 0.35,
+            },
+            tooltip=folium.GeoJsonTooltip(fields=["name"], labels=False),
+            popup=folium.GeoJsonPopup(
+                fields=["name", "disaster_type", "risk_level", "description"],
+                aliases=["Zone", "Type", "Risk", ""],
+            ),
+        ).add_to(m)
 
-        html = f"""
-        <b>{log.city}</b><br>
-        Temp: {log.temperature}°C<br>
-        Rain: {log.rainfall_1h}mm<br>
-        Humidity: {log.humidity}%
-        """
-        
-        folium.Marker(
-            [log.lat, log.lon],
-            popup=html,
-            tooltip=f"{log.city}: {log.rainfall_1h}mm Rain",
-            icon=folium.Icon(color=icon_color, icon="cloud")
+    # 3. Weather: clustered, markers created client-side from plain rows
+    if not _weather.empty:
+        FastMarkerCluster(
+            weather_points(_weather, _alerts, simulate),
+            callback=WEATHER_CALLBACK,
+            name="Live Weather",
         ).add_to(m)
 
-    return m
\ No newline at end of file
+    return m
@@ -5,7 +5,6 @@ import datetime
 import time
 import requests
 import pandas as pd
-import joblib 
 import plotly.graph_objects as go
 
 # Add parent directory to path
@@ -13,11 +12,16 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 import streamlit as st
 from streamlit_folium import st_folium
-import folium
+from sqlalchemy import select, func
 from backend.database import SessionLocal
-from backend.models import RiskZone, WeatherLog
+from backend.models import RiskZone, CurrentCondition, ZoneAlertState
 from components.alerts import show_alert_banner
+from components.map_view import render_map
 from backend.weather_service import fetch_live_weather 
+from backend.spatial import zone_index
+from backend.alert_engine import open_alerts_query
+from backend.rollups import get_daily_trend
+from backend.model_registry import model_registry
 
 # Page Config
 st.set_page_config(page_title="GeoGuard Kenya", layout="wide", page_icon="🌍")
@@ -26,112 +30,65 @@ st.set_page_config(page_title="GeoGuard Kenya", layout="wide", page_icon="🌍")
 SIGN_PLACEHOLDER = "Select the sign..."
 LOCATION_PLACEHOLDER = "Select area to observe..."
 
-# --- 1. COORDINATE MAPPING (Updated to match Backend) ---
-def get_zone_coords(zone_name):
-    """Maps Zone Names to Real Coordinates so they don't appear at [0,0]"""
-    locations = {
-        # --- Nairobi & Urban ---
-        "Mathare Settlements": (-1.26, 36.85),
-        "Eastlands": (-1.28, 36.89),
-        "South C": (-1.32, 36.83),
-        "Kibera (Soweto Highrise)": (-1.31, 36.79),
-        "Dagoretti Corner": (-1.30, 36.76),
-        "Westlands": (-1.27, 36.81),
-        "Kasarani": (-1.21, 36.92),
-        "Embakasi": (-1.30, 36.95),
-        "Langata": (-1.35, 36.75),
-        "Ruiru": (-1.15, 36.95),
-        "Thika": (-1.03, 37.07),
-        "Juja": (-1.18, 37.05),
-        "Kiambu Town": (-1.17, 36.83),
-        "Githurai": (-1.15, 36.90),
-        "Kahawa West": (-1.20, 36.90),
-        "Kawangware": (-1.28, 36.75),
-        
-        # --- Lake Region ---
-        "Kisumu Central": (-0.10, 34.75),
-        "Dunga Beach": (-0.14, 34.73),
-        "Homa Bay Shores": (-0.52, 34.45),
-        "Budalangi Floodplains": (0.10, 34.00),
-        "Kisii Highlands": (-0.68, 34.77),
-        "Migori Town": (-1.06, 34.48),
-        "Rongo": (-0.83, 34.45),
-
-        # --- Rift Valley & Central ---
-        "Mai Mahiu Gully": (-0.99, 36.56),
-        "Murang'a East Slopes": (-0.72, 37.15),
-        "Laikipia Dam Zone": (0.36, 36.78),
-        "Tiaty": (1.00, 36.10),
-        "Narok West": (-1.20, 35.50),
-        "Weiwei": (1.45, 35.45),
-        "Chesongoch": (1.13, 35.64),
-        "Elgeyo Escarpment": (0.85, 35.50),
-        "Kericho Tea Zone": (-0.37, 35.28),
-        "Bomet Lowlands": (-0.80, 35.30),
-        "Nakuru Town": (-0.28, 36.07),
-        "Naivasha Lakeside": (-0.72, 36.43),
-        "Eldoret Industrial": (0.52, 35.27),
-        
-        # --- ASAL & North ---
-        "Turkana North (Kibish)": (4.50, 35.80),
-        "Turkana Central": (3.11, 35.60),
-        "Lobere Dam Area": (3.58, 36.12),
-        "Mandera East": (3.93, 41.86),
-        "Wajir South": (1.00, 40.00),
-        "Marsabit North": (3.00, 37.50),
-        "Garissa North": (-0.10, 39.50),
-        "Shimbirey": (-0.42, 39.63),
-        "Isiolo": (0.35, 37.58),
-        "Samburu East": (1.20, 37.20),
-        "Kitui Central": (-1.35, 38.00),
-        "Makueni North": (-1.50, 37.70),
-        "Kitui South": (-1.60, 38.20),
-        "Machakos Town": (-1.50, 37.25),
-        "Kajiado Central": (-1.85, 36.80),
-        
-        # --- Coastal ---
-        "Hola": (-1.50, 40.03),
-        "Kwale Hinterland": (-4.17, 39.45),
-        "Ganze": (-3.50, 39.75),
-        "Taita Taveta Hills": (-3.40, 38.50),
-        "Mombasa Island": (-4.05, 39.66),
-        "Likoni": (-4.10, 39.65),
-        "Malindi": (-3.22, 40.12),
-        "Kilifi Town": (-3.63, 39.85),
-    }
-    return locations.get(zone_name, (-1.29, 36.82)) # Default to Nairobi
-
 # --- 2. DATA FETCHING ---
-def get_data():
-    db = SessionLocal()
-    zones = db.query(RiskZone).all()
-    weather = db.query(WeatherLog).order_by(WeatherLog.city, WeatherLog.timestamp.desc()).distinct(WeatherLog.city).all()
-    db.close()
-    return zones, weather
-
-zones, weather_logs = get_data()
-location_names = sorted([log.city for log in weather_logs]) if weather_logs else ["Nairobi"]
+# Only the columns the views use (no geometry blobs, no detached ORM objects; polygons live in map_view)
+ZONE_COLUMNS = [
+    RiskZone.name, RiskZone.county, RiskZone.risk_level, RiskZone.disaster_type,
+]
+WEATHER_COLUMNS = [
+    CurrentCondition.city, CurrentCondition.temperature, CurrentCondition.rainfall_1h,
+    CurrentCondition.humidity, CurrentCondition.lat, CurrentCondition.lon, CurrentCondition.timestamp,
+]
+ALERT_COLUMNS = [ZoneAlertState.city, ZoneAlertState.status, ZoneAlertState.label, ZoneAlertState.severity, ZoneAlertState.since]
+
+def get_data_version():
+    """
+    Cheap "has anything changed?" check: newest reading, newest alert transition and zone count.
+    Runs on every rerun; the heavy loads below only run when this changes.
+    """
+    with SessionLocal() as db:
+        return tuple(db.execute(select(
+            select(func.max(CurrentCondition.timestamp)).scalar_subquery(),
+            select(func.max(ZoneAlertState.since)).scalar_subquery(),
+            select(func.count(RiskZone.id)).scalar_subquery(),
+        )).one())
+
+def _frame(db, query, columns):
+    return pd.DataFrame(db.execute(query).all(), columns=[c.key for c in columns])
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def get_data(version):
+    """Zones, latest weather (one row per zone) and open alerts as DataFrames, cached per data version."""
+    with SessionLocal() as db:
+        zones = _frame(db, select(*ZONE_COLUMNS).order_by(RiskZone.id), ZONE_COLUMNS)
+        # Maintained by the ingestion job (no DISTINCT ON over history)
+        weather = _frame(db, select(*WEATHER_COLUMNS), WEATHER_COLUMNS)
+        # Alert states are maintained by the ingestion job, we only read the open ones
+        alerts = _frame(db, open_alerts_query().with_only_columns(*ALERT_COLUMNS), ALERT_COLUMNS)
+    return zones, weather, alerts
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def get_trend(version, city, days=90):
+    """Daily rainfall/temperature for one zone from the rollup table (raw readings are pruned after retention)."""
+    with SessionLocal() as db:
+        rows = get_daily_trend(db, city, days)
+    return pd.DataFrame([(r.day, r.rain_total, r.temp_mean) for r in rows], columns=["day", "rain_total", "temp_mean"])
+
+data_version = get_data_version()
+zones, weather_logs, open_alerts = get_data(data_version)
+location_names = sorted(weather_logs["city"]) if not weather_logs.empty else ["Nairobi"]
 current_time = datetime.datetime.now().strftime("%m/%d/%Y, %I:%M:%S %p")
 
-# --- 3. ML MODEL LOADING ---
-@st.cache_resource
-def load_seasonal_model():
-    # Robust path finding
-    model_path = os.path.join(os.path.dirname(__file__), "..", "backend", "seasonal_model.pkl")
-    model_path = os.path.abspath(model_path)
-    try:
-        return joblib.load(model_path)
-    except FileNotFoundError:
-        return None
-
-def predict_future_season(model, days_ahead=90):
-    start_date = datetime.datetime.now()
-    dates = [start_date + datetime.timedelta(days=i) for i in range(days_ahead)]
-    future_df = pd.DataFrame({"date": dates})
-    future_df["day_of_year"] = future_df["date"].dt.dayofyear
-    predictions = model.predict(future_df[["day_of_year"]])
-    future_df["predicted_rain"] = predictions
-    return future_df
+# --- 3. SEASONAL FORECAST (precomputed lookup tables, see backend/forecast.py) ---
+NATIONAL_FORECAST = "🇰🇪 National"
+
+def predict_future_season(days_ahead=90, zone=None):
+    """
+    Slices the 366-day table written at training time (the zone's own one if it has a model,
+    loaded lazily by the model registry); None until the model has been trained.
+    """
+    result = model_registry.forecast(zone, days_ahead)
+    return pd.DataFrame(result) if result is not None else None
 
 # --- SESSION STATE ---
 if 'validation_result' not in st.session_state:
@@ -163,19 +120,24 @@ if app_mode == "🔮 Seasonal Predictions":
         """)
         
         days = st.slider("Forecast Horizon (Days)", 30, 180, 90)
-        model = load_seasonal_model()
+        forecast_zone = st.selectbox("Zone Model", [NATIONAL_FORECAST] + model_registry.zones())
         
         if st.button("🚀 Run Prediction"):
-            if model:
-                st.session_state.forecast = predict_future_season(model, days)
+            forecast = predict_future_season(days, None if forecast_zone == NATIONAL_FORECAST else forecast_zone)
+            if forecast is not None:
+                st.session_state.forecast = forecast
                 st.success("Prediction Complete")
             else:
-                st.error("⚠️ Model not found! Ensure 'backend/seasonal_model.pkl' exists.")
+                st.error("⚠️ Forecast table not found! Run 'python -m scripts.train_model' to create 'backend/seasonal_forecast.npz'.")
 
     with col2:
         if 'forecast' in st.session_state:
             data = st.session_state.forecast
             fig = go.Figure()
+            # Uncertainty band from the spread of the forest's trees
+            if 'p10' in data and 'p90' in data:
+                fig.add_trace(go.Scatter(x=data['date'], y=data['p90'], mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'))
+                fig.add_trace(go.Scatter(x=data['date'], y=data['p10'], mode='lines', line=dict(width=0), fill='tonexty', fillcolor='rgba(0,204,150,0.2)', name='10-90% Range'))
             fig.add_trace(go.Scatter(x=data['date'], y=data['predicted_rain'], mode='lines', name='Predicted Rainfall', line=dict(color='#00CC96', width=3), fill='tozeroy'))
             
             peak_rain = data['predicted_rain'].max()
@@ -228,8 +190,11 @@ elif app_mode == "🌿 Asili Smart":
                 try:
                     response = requests.get('https://ipinfo.io/json', timeout=3)
                     data = response.json()
+                    # Resolve the GPS fix to a risk zone polygon (falls back to city-name matching)
+                    lat, lon = (float(v) for v in data.get('loc', '').split(','))
+                    zone_hits = [z["name"] for z in zone_index.find_zones(lat, lon) if z["name"] in location_names]
                     detected_city = data.get('city', 'Unknown')
-                    match = next((loc for loc in location_names if detected_city in loc), None)
+                    match = zone_hits[0] if zone_hits else next((loc for loc in location_names if detected_city in loc), None)
                     target_city = match if match else next((loc for loc in location_names if "Nairobi" in loc), None)
                 except:
                     target_city = next((loc for loc in location_names if "Nairobi" in loc), None)
@@ -258,7 +223,7 @@ elif app_mode == "🌿 Asili Smart":
         res = st.session_state.validation_result
         loc = res['location']
         sign = res['sign']
-        city_data = next((log for log in weather_logs if log.city == loc), None)
+        city_data = next((log for log in weather_logs.itertuples() if log.city == loc), None)
         
         if city_data:
             # Validation Logic
@@ -273,7 +238,7 @@ elif app_mode == "🌿 Asili Smart":
                     msg = f"✅ Asili Smart confirms your observation. Satellites also detect rainfall ({city_data.rainfall_1h}mm)."
                 else:
                     status, header_color = "CAUTION", "#FFC107"
-                    msg = f"⚠️ Asili Smart reports clear skies. Satellites show 0mm rain."
+                    msg = "⚠️ Asili Smart reports clear skies. Satellites show 0mm rain."
             elif sign['type'] == "Drought":
                 if is_hot and city_data.rainfall_1h == 0:
                     status, header_color = "VALIDATED", "#F44336"
@@ -325,23 +290,20 @@ else:
 
     active_alerts = []
     critical_count = 0
-    ASAL_COUNTIES = ["Mandera", "Wajir", "Turkana", "Marsabit", "Garissa", "Isiolo", "Samburu"]
 
-    for zone in zones:
+    for zone in zones.itertuples():
         if zone.risk_level == "Critical":
             critical_count += 1
             if simulate_disaster and "Mathare" in zone.name:
                 active_alerts.append(f"URGENT: Flash Flood detected in {zone.name}")
 
-    for log in weather_logs:
-        rain = log.rainfall_1h
-        if simulate_disaster and ("Mathare" in log.city or "Mai Mahiu" in log.city): rain = 65.0 
-        
-        if rain > 50:
-            active_alerts.append(f"CRITICAL WEATHER: Heavy Rainfall ({rain}mm) in {log.city}")
+    # Open alerts come straight from the alert engine (no recomputation per rerun)
+    for alert in open_alerts.itertuples():
+        if alert.severity >= 2:
+            active_alerts.append(f"{alert.label} in {alert.city} (since {alert.since.strftime('%d %b %H:%M')})")
 
-        if any(c in log.city for c in ASAL_COUNTIES) and log.temperature > 32.0 and rain < 1.0:
-            active_alerts.append(f"DROUGHT ALERT: Extreme Heat ({log.temperature}°C) in {log.city}")
+    if simulate_disaster:
+        active_alerts.append("🚨 CRITICAL: Heavy Rainfall (65.0mm) in Mathare / Mai Mahiu [SIMULATION]")
 
     show_alert_banner(active_alerts)
 
@@ -350,38 +312,24 @@ else:
     col2.metric("High Risk Areas", critical_count, "Based on Historical Data")
     col3.metric("Live Sensors", len(weather_logs), "Real-Time Updates")
 
-    # --- 3. THE MAP FIX (Using get_zone_coords) ---
-    m = folium.Map(location=[0.0236, 37.9062], zoom_start=6, tiles="CartoDB dark_matter")
+    # --- 3. THE MAP (polygon layer + clustered weather, cached per data version) ---
+    m = render_map(data_version, weather_logs, open_alerts, disaster_filter, simulate_disaster)
 
-    for zone in zones:
-        if disaster_filter != "All" and disaster_filter not in zone.disaster_type: continue
-        
-        # FIX: Get Real Coords
-        lat, lon = get_zone_coords(zone.name)
-        
-        color = "orange"
-        if zone.risk_level == "Critical": color = "red"
-        if "Drought" in zone.disaster_type: color = "brown"
-        
-        if zone.geom:
-            folium.Marker(
-                location=[lat, lon], # Correct Coords
-                popup=f"<b>{zone.name}</b><br>Risk: {zone.risk_level}",
-                icon=folium.Icon(color=color, icon="info-sign")
-            ).add_to(m)
-
-    for log in weather_logs:
-        rain = log.rainfall_1h
-        if simulate_disaster and ("Mathare" in log.city or "Mai Mahiu" in log.city): rain = 65.0
-        icon_color = "red" if rain > 50 else "blue" if rain > 5 else "green"
-        
-        folium.Marker(
-            [log.lat, log.lon],
-            popup=f"<b>{log.city}</b><br>Rain: {rain}mm",
-            icon=folium.Icon(color=icon_color, icon="cloud")
-        ).add_to(m)
+    # returned_objects=[]: panning/zooming the map does not trigger a rerun
+    st_folium(m, width="100%", height=600, returned_objects=[])
 
-    st_folium(m, width="100%", height=600)
+    # --- 4. LONG-RANGE TREND (daily rollups, cached per data version) ---
+    trend_zone = st.selectbox("📈 90-Day Trend", location_names)
+    trend = get_trend(data_version, trend_zone)
+    if trend.empty:
+        st.info("No daily rollups for this zone yet (they are built hourly from the live readings).")
+    else:
+        fig = go.Figure()
+        fig.add_trace(go.Bar(x=trend["day"], y=trend["rain_total"], name="Rainfall (mm/day)", marker_color="#00CC96"))
+        fig.add_trace(go.Scatter(x=trend["day"], y=trend["temp_mean"], name="Mean Temp (°C)", yaxis="y2", line=dict(color="#FFA15A")))
+        fig.update_layout(yaxis_title="Rainfall (mm)", yaxis2=dict(title="Temp (°C)", overlaying="y", side="right"),
+                          template="plotly_dark", height=350)
+        st.plotly_chart(fig, use_container_width=True)
 
     if st.button("🔄 Refresh Data"):
         st.rerun()
\ No newline at end of file
@@ -0,0 +1,28 @@
+# scripts/export_history.py
+import sys
+import os
+import argparse
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.database import SessionLocal
+from backend.history_store import export_raw_logs, export_daily_rollups, OBSERVED_DIR
+
+def main():
+    parser = argparse.ArgumentParser(description="Export new weather_logs rows and daily rollups to the Parquet history store.")
+    parser.add_argument("--only", choices=["raw", "daily"], help="Export just one dataset")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.only in (None, "raw"):
+            print(f"📦 Raw readings: {export_raw_logs(db):,} new rows")
+        if args.only in (None, "daily"):
+            print(f"📦 Daily rollups: {export_daily_rollups(db):,} new rows")
+        print(f"✅ Exported to {OBSERVED_DIR}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
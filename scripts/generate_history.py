@@ -1,56 +1,155 @@
 # scripts/generate_history.py
 import sys
 import os
+import argparse
+import datetime
+import time
+import zlib
 import pandas as pd
 import numpy as np
-import datetime
+import pyarrow as pa
 
 # Add parent directory to path to ensure we can find paths easily
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.history_store import HistoryStore, history_store, HISTORY_DIR, NATIONAL_ZONE
+
+CSV_PATH = os.path.join("data", "processed", "kenya_weather_history.csv")
+
+# --- CLIMATE PROFILES ---
+# National baseline: Long Rains peak ~April (day 105), Short Rains ~November (day 320)
+NATIONAL = {"long_peak": 105, "long_amp": 18.0, "short_peak": 320, "short_amp": 12.0,
+            "width": 25.0, "noise": 4.0, "base_temp": 29.0}
+
+# Multipliers per hazard type (arid zones get less rain and more heat, highlands the opposite)
+HAZARD_PROFILES = {
+    "Drought": {"rain": 0.4, "temp": 4.0},
+    "Landslide": {"rain": 1.5, "temp": -6.0},
+    "Flood": {"rain": 1.3, "temp": 0.0},
+    "Backflow": {"rain": 1.2, "temp": -1.0},
+}
+
+def zone_climate(name, disaster_type=None, seed=42):
+    """
+    Per-zone seasonal parameters: the national profile scaled by hazard type,
+    then jittered by a generator seeded from (seed, zone name) so every run is identical.
+    """
+    rng = np.random.default_rng([seed, zlib.crc32(name.encode())])
+    profile = next((p for key, p in HAZARD_PROFILES.items() if key in (disaster_type or "")), {"rain": 1.0, "temp": 0.0})
+    return {
+        "long_peak": NATIONAL["long_peak"] + rng.integers(-15, 16),
+        "long_amp": NATIONAL["long_amp"] * profile["rain"] * rng.uniform(0.8, 1.2),
+        "short_peak": NATIONAL["short_peak"] + rng.integers(-15, 16),
+        "short_amp": NATIONAL["short_amp"] * profile["rain"] * rng.uniform(0.8, 1.2),
+        "width": NATIONAL["width"] * rng.uniform(0.85, 1.15),
+        "noise": NATIONAL["noise"] * rng.uniform(0.8, 1.2),
+        "base_temp": NATIONAL["base_temp"] + profile["temp"] + rng.uniform(-1.5, 1.5),
+    }
+
+def simulate(day_of_year, climate, rng):
+    """Whole series in a handful of array operations (no per-day Python loop)."""
+    # --- Simulate Seasonality (The "Signal") ---
+    day_of_year = day_of_year.astype(np.float64)   # int16 would overflow when squared
+    two_w2 = 2 * climate["width"] ** 2
+    base_rain = (climate["long_amp"] * np.exp(-((day_of_year - climate["long_peak"]) ** 2) / two_w2)
+                 + climate["short_amp"] * np.exp(-((day_of_year - climate["short_peak"]) ** 2) / two_w2))
+
+    # Base trend + Random Noise
+    rainfall = np.maximum(0, base_rain + rng.normal(0, climate["noise"], day_of_year.size))
+
+    # Temperature is inverse to rain (Cooler when raining)
+    temp = climate["base_temp"] - rainfall * 0.15 + rng.normal(0, 1.5, day_of_year.size)
+    return np.round(rainfall, 2).astype(np.float32), np.round(temp, 1).astype(np.float32)
+
+def date_axis(start_year=2015, years=10):
+    dates = pd.date_range(start=datetime.date(start_year, 1, 1), end=datetime.date(start_year + years, 1, 1), freq="D")
+    return dates, dates.dayofyear.to_numpy(dtype=np.int16), dates.year.to_numpy(dtype=np.int16)
+
+# =========================================================
+# 1. NATIONAL SERIES (history store + CSV for notebooks and older tooling)
+# =========================================================
+def generate_kenya_weather_history(years=10, seed=42, output_path=CSV_PATH, store=history_store, start_year=2015):
+    print(f"⏳ Generating {years} years of historical weather data from {start_year}...")
+
+    dates, day_of_year, year = date_axis(start_year, years)
+    rainfall, temp = simulate(day_of_year, NATIONAL, np.random.default_rng(seed))
+
+    df = pd.DataFrame({
+        "date": dates,
+        "day_of_year": day_of_year,
+        "rainfall_mm": rainfall,
+        "temperature_c": temp,
+    })
 
-def generate_kenya_weather_history(years=10):
-    print("⏳ Generating 10 years of historical weather data...")
-    
-    # Define file path using your structure
-    output_path = os.path.join("data", "processed", "kenya_weather_history.csv")
-    
-    start_date = datetime.date(2015, 1, 1)
-    end_date = datetime.date(2025, 1, 1)
-    dates = pd.date_range(start=start_date, end=end_date, freq='D')
-    
-    data = []
-    
-    for date in dates:
-        day_of_year = date.dayofyear
-        
-        # --- Simulate Seasonality (The "Signal") ---
-        # 1. Long Rains (Peak ~April, Day 105)
-        long_rain_prob = 18 * np.exp(-((day_of_year - 105)**2) / (2 * 25**2))
-        
-        # 2. Short Rains (Peak ~November, Day 320)
-        short_rain_prob = 12 * np.exp(-((day_of_year - 320)**2) / (2 * 25**2))
-        
-        # Base trend + Random Noise (0 to 5mm variance)
-        base_rain = long_rain_prob + short_rain_prob
-        rainfall = max(0, base_rain + np.random.normal(0, 4)) 
-        
-        # Temperature is inverse to rain (Cooler when raining)
-        temp = 29 - (rainfall * 0.15) + np.random.normal(0, 1.5)
-        
-        data.append({
-            "date": date,
-            "day_of_year": day_of_year,
-            "rainfall_mm": round(rainfall, 2),
-            "temperature_c": round(temp, 1)
-        })
-        
-    df = pd.DataFrame(data)
-    
     # Ensure directory exists
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    
+
     df.to_csv(output_path, index=False)
     print(f"✅ Data saved to: {output_path} ({len(df)} rows)")
 
+    # Same series as zone "National" in the Parquet store (what scripts/train_model.py reads)
+    store.write(df.assign(zone=NATIONAL_ZONE, year=year), f"national-{seed}", replace=True)
+    print(f"✅ Data saved to: {store.root} (zone={NATIONAL_ZONE})")
+
+# =========================================================
+# 2. MULTI-ZONE SERIES (Parquet, one file per zone)
+# =========================================================
+def generate_zone_history(zones, start_year=2015, years=10, seed=42, output_dir=HISTORY_DIR, zones_per_write=64):
+    """
+    zones: [(name, disaster_type)].
+    Streams zones_per_write zones at a time into the history store (output_dir/zone=<name>/, every year in one file),
+    so memory stays flat however many zones or decades are requested.
+    Each zone is written whole in a single call, so a re-run replaces its old files instead of adding to them.
+    """
+    store = HistoryStore(output_dir)
+    dates, day_of_year, year = date_axis(start_year, years)
+    date_values = dates.values.astype("datetime64[D]")
+    started = time.perf_counter()
+    total = 0
+
+    for chunk_no, i in enumerate(range(0, len(zones), zones_per_write)):
+        chunk = zones[i:i + zones_per_write]
+        rain_parts, temp_parts = [], []
+        for name, disaster_type in chunk:
+            rng = np.random.default_rng([seed, zlib.crc32(name.encode()), 1])
+            rainfall, temp = simulate(day_of_year, zone_climate(name, disaster_type, seed), rng)
+            rain_parts.append(rainfall)
+            temp_parts.append(temp)
+
+        n = len(chunk)
+        table = pa.table({
+            "zone": np.repeat([name for name, _ in chunk], day_of_year.size),
+            "date": np.tile(date_values, n),
+            "year": np.tile(year, n),
+            "day_of_year": np.tile(day_of_year, n),
+            "rainfall_mm": np.concatenate(rain_parts),
+            "temperature_c": np.concatenate(temp_parts),
+        })
+        total += store.write(table, f"zones-{seed}-{chunk_no}", replace=True)
+        print(f"   💾 {min(i + n, len(zones))}/{len(zones)} zones ({total:,} rows)")
+
+    print(f"✅ {total:,} rows for {len(zones)} zones written to {output_dir} in {time.perf_counter() - started:.1f}s")
+    return total
+
+def zones_from_db():
+    from backend.zone_registry import zone_registry
+    return [(z["name"], z["disaster_type"]) for z in zone_registry.zones()]
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic Kenyan weather history.")
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--start-year", type=int, default=2015)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--zones", type=int, default=0, help="Also write N synthetic zones to Parquet (load tests)")
+    parser.add_argument("--from-db", action="store_true", help="Also write every risk zone in the database to Parquet")
+    parser.add_argument("--output", default=HISTORY_DIR)
+    args = parser.parse_args()
+
+    generate_kenya_weather_history(args.years, args.seed, start_year=args.start_year)
+
+    zones = zones_from_db() if args.from_db else []
+    zones += [(f"Synthetic Zone {i:05d}", None) for i in range(args.zones)]
+    if zones:
+        generate_zone_history(zones, args.start_year, args.years, args.seed, args.output)
+
 if __name__ == "__main__":
-    generate_kenya_weather_history()
\ No newline at end of file
+    main()
@@ -0,0 +1,72 @@
+# scripts/import_zones.py
+import sys
+import os
+import json
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from shapely.geometry import shape, MultiPolygon
+from geoalchemy2.shape import from_shape
+from backend.database import SessionLocal, engine
+from backend.models import RiskZone, Base
+from backend.zone_registry import ensure_zone_columns
+
+def import_zones(path):
+    """
+    Loads risk zones from a GeoJSON FeatureCollection.
+    Expected feature properties: name, county, risk_level, disaster_type, description
+    (the seed script's short keys 'risk', 'type' and 'desc' also work).
+    Coordinates are derived from each polygon, so no code edits are needed for new zones.
+    """
+    with open(path, encoding="utf-8") as f:
+        features = json.load(f)["features"]
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    ensure_zone_columns(db)
+
+    print(f"🌱 Importing {len(features)} zones from {path}...")
+    existing = {name for (name,) in db.query(RiskZone.name).all()}
+
+    count = 0
+    try:
+        for feature in features:
+            props = feature.get("properties") or {}
+            name = props.get("name")
+            if not name or name in existing:
+                continue
+
+            geom = shape(feature["geometry"])
+            # risk_zones stores POLYGONs, so keep the largest part of a multipolygon
+            if isinstance(geom, MultiPolygon):
+                print(f" -> {name}: MultiPolygon, keeping its largest part.")
+                geom = max(geom.geoms, key=lambda g: g.area)
+            point = geom.representative_point()
+
+            db.add(RiskZone(
+                name=name,
+                county=props.get("county"),
+                risk_level=props.get("risk_level", props.get("risk")),
+                disaster_type=props.get("disaster_type", props.get("type")),
+                description=props.get("description", props.get("desc")),
+                geom=from_shape(geom, srid=4326),
+                centroid_lat=point.y,
+                centroid_lon=point.x,
+            ))
+            existing.add(name)
+            count += 1
+
+        db.commit()
+        print(f"✅ Success! Added {count} new zones to the National Registry.")
+    except Exception as e:
+        print(f"❌ Error during import: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python -m scripts.import_zones path/to/zones.geojson")
+        sys.exit(1)
+    import_zones(sys.argv[1])
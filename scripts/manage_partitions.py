@@ -0,0 +1,46 @@
+# scripts/manage_partitions.py
+import sys
+import os
+import argparse
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.database import SessionLocal
+from backend.partitions import create_partitions, expire_partitions, list_partitions, migrate_to_partitioned
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage monthly weather_logs partitions.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    create = sub.add_parser("create", help="Create partitions for this month and the next N months")
+    create.add_argument("--ahead", type=int, default=3)
+
+    prune = sub.add_parser("prune", help="Detach (or drop) partitions older than N months")
+    prune.add_argument("--keep", type=int, default=12)
+    prune.add_argument("--drop", action="store_true", help="Drop instead of detach (no archive!)")
+
+    sub.add_parser("list", help="Show attached partitions")
+
+    migrate = sub.add_parser("migrate", help="Convert an old unpartitioned weather_logs table")
+    migrate.add_argument("--ahead", type=int, default=3)
+
+    args = parser.parse_args()
+    db = SessionLocal()
+    try:
+        if args.command == "create":
+            created = create_partitions(db, args.ahead)
+            print(f"✅ Partitions ready: {', '.join(created) or 'none'}")
+        elif args.command == "prune":
+            expired = expire_partitions(db, args.keep, args.drop)
+            print(f"✅ {len(expired)} expired partition(s) handled.")
+        elif args.command == "list":
+            for name in list_partitions(db):
+                print(f" -> {name}")
+        elif args.command == "migrate":
+            migrate_to_partitioned(db, args.ahead)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text # Import text to run raw SQL
 from backend.database import SessionLocal, engine
 from backend.models import RiskZone, Base
+from backend.zone_registry import ensure_zone_columns
 
 def seed_data():
     print("🛠️  Initializing Database Tables...")
@@ -25,6 +26,8 @@ def seed_data():
     print("✅ Tables Verified.")
 
     db = SessionLocal()
+    # Older databases need the centroid columns before we can query RiskZone
+    ensure_zone_columns(db)
     
     # --- 3. FLOOD ZONES ---
     flood_zones = [
@@ -115,6 +118,9 @@ def seed_data():
         
         db.commit()
         print(f"✅ Success! Added {count} new zones to the National Registry.")
+
+        # Derive map/scan coordinates from the new polygons
+        ensure_zone_columns(db)
     except Exception as e:
         print(f"❌ Error during seeding: {e}")
         db.rollback()
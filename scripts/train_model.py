@@ -1,25 +1,52 @@
 # scripts/train_model.py
 import sys
 import os
+import json
+import argparse
+import datetime
 import pandas as pd
 import joblib
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, r2_score
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.forecast import save_forecast_table
+from backend.forest import export_forest
+from backend.model_registry import MODEL_REGISTRY_DIR, zone_slug
+from backend.history_store import HistoryStore, history_store, observed_daily, NATIONAL_ZONE
+
 # Setup Paths
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 DATA_PATH = os.path.join(BASE_DIR, "data", "processed", "kenya_weather_history.csv")
 MODEL_PATH = os.path.join(BASE_DIR, "backend", "seasonal_model.pkl")
+FOREST_PATH = os.path.join(BASE_DIR, "backend", "seasonal_model.forest")
+
+# Synthetic series (generate_history) or real readings exported from Postgres (history_store.export_from_postgres)
+SOURCES = {"history": history_store, "observed": observed_daily}
+TRAINING_COLUMNS = ["day_of_year", "rainfall_mm"]
+
+def load_training_data(store=history_store, zone=NATIONAL_ZONE):
+    """Only the two columns the model uses, read from this zone's partition alone."""
+    if zone in store.zones():
+        return store.read(columns=TRAINING_COLUMNS, zones=[zone])
+    # Older checkouts only have the national CSV (synthetic, so never a stand-in for observed data)
+    if store is history_store and zone == NATIONAL_ZONE and os.path.exists(DATA_PATH):
+        return pd.read_csv(DATA_PATH, usecols=TRAINING_COLUMNS)
+    return None
 
-def train():
-    if not os.path.exists(DATA_PATH):
-        print(f"❌ Error: Data file not found at {DATA_PATH}")
+def train(store=history_store):
+    print(f"🧠 Loading {NATIONAL_ZONE} series from {store.root}...")
+    df = load_training_data(store)
+    if df is None and store is not history_store:
+        # Exports only hold real zones: keep the current national model rather than train it on other data
+        print(f"⚠️ No {NATIONAL_ZONE} series in {store.root}: skipping the national model (zone models only).")
+        return
+    if df is None:
+        print(f"❌ Error: No {NATIONAL_ZONE} history in {store.root} (or {DATA_PATH})")
         print("   -> Run 'python -m scripts.generate_history' first.")
         return
-
-    print(f"🧠 Loading data from {DATA_PATH}...")
-    df = pd.read_csv(DATA_PATH)
     
     # Features (X): Day of Year
     # Target (y): Rainfall
@@ -39,7 +66,7 @@ def train():
     mae = mean_absolute_error(y_test, predictions)
     r2 = r2_score(y_test, predictions)
     
-    print(f"📊 Model Performance:")
+    print("📊 Model Performance:")
     print(f"   - Mean Absolute Error: {mae:.2f} mm")
     print(f"   - Accuracy (R² Score): {r2:.2f}")
     
@@ -47,5 +74,115 @@ def train():
     joblib.dump(model, MODEL_PATH)
     print(f"💾 Model saved to: {MODEL_PATH}")
 
+    # Flat NumPy copy for serving: memory-mapped, no unpickling, no scikit-learn at runtime
+    export_forest(model, FOREST_PATH)
+    print(f"🌲 Forest arrays exported to: {FOREST_PATH}")
+
+    # Precompute every possible answer (366 days + quantiles) so serving never loads the model
+    table_path = save_forecast_table(model)
+    print(f"📅 Forecast table saved to: {table_path}")
+
+# =========================================================
+# PER-ZONE MODELS (one process per core, published as a registry version)
+# =========================================================
+def _fit(X, y, n_jobs=1):
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    model = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=n_jobs)
+    model.fit(X_train, y_train)
+    predictions = model.predict(X_test)
+    return model, mean_absolute_error(y_test, predictions), r2_score(y_test, predictions)
+
+def _train_zone(zone, data_dir, version_dir):
+    """Runs in a worker process: opens only data_dir/zone=<name>/, fits, writes model + forecast table."""
+    df = HistoryStore(data_dir).read(columns=TRAINING_COLUMNS, zones=[zone])
+    model, mae, r2 = _fit(df[["day_of_year"]], df["rainfall_mm"])
+
+    slug = zone_slug(zone)
+    joblib.dump(model, os.path.join(version_dir, f"{slug}.pkl"))
+    export_forest(model, os.path.join(version_dir, f"{slug}.forest"))
+    save_forecast_table(model, os.path.join(version_dir, f"{slug}.npz"))
+    return zone, {"model": f"{slug}.pkl", "forest": f"{slug}.forest", "table": f"{slug}.npz", "rows": len(df),
+                  "mae": round(mae, 3), "r2": round(r2, 3)}
+
+def train_zones(store=history_store, registry_dir=MODEL_REGISTRY_DIR, workers=None, zones=None, allow_partial=False):
+    """
+    Trains one model per zone in parallel and publishes them as a new registry version.
+    LATEST is only switched once every model is on disk, so readers never see a half-written version.
+    If any zone failed the version is kept on disk but not published, unless allow_partial=True.
+    """
+    if zones is None:
+        zones = [z for z in store.zones() if z != NATIONAL_ZONE]
+    if not zones:
+        print(f"❌ Error: No zone history found in {store.root}")
+        print("   -> Run 'python -m scripts.generate_history --from-db' first.")
+        return None
+    data_dir = store.root
+
+    # Two zones sharing a slug would silently overwrite each other's files
+    slugs = {}
+    for zone in zones:
+        slugs.setdefault(zone_slug(zone), []).append(zone)
+    clashes = [names for names in slugs.values() if len(names) > 1]
+    if clashes:
+        raise ValueError(f"Zones share a model file name: {clashes}")
+
+    version = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    version_dir = os.path.join(registry_dir, version)
+    os.makedirs(version_dir, exist_ok=True)
+
+    print(f"🏋️  Training {len(zones)} zone models with {workers or os.cpu_count()} workers...")
+    entries, failed = {}, []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_train_zone, zone, data_dir, version_dir): zone for zone in zones}
+        for future in as_completed(futures):
+            try:
+                zone, entry = future.result()
+                entries[zone] = entry
+                print(f"   ✅ {zone}: MAE {entry['mae']:.2f} mm, R² {entry['r2']:.2f}")
+            except Exception as e:
+                failed.append(futures[future])
+                print(f"   ❌ {futures[future]}: {e}")
+
+    metadata = {
+        "version": version,
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "algorithm": "RandomForestRegressor(n_estimators=100)",
+        "features": ["day_of_year"],
+        "target": "rainfall_mm",
+        "source": os.path.abspath(data_dir),
+        "failed": failed,
+        "zones": entries,
+    }
+    with open(os.path.join(version_dir, "metadata.json"), "w") as f:
+        json.dump(metadata, f, indent=2)
+
+    if failed and not allow_partial:
+        print(f"❌ {len(failed)} zone(s) failed: LATEST still points to the previous version ({version_dir} kept for inspection)")
+        print("   -> Fix the failures and retrain, or pass --allow-partial to publish it anyway.")
+        return None
+
+    # Atomic switch to the new version
+    latest_tmp = os.path.join(registry_dir, "LATEST.tmp")
+    with open(latest_tmp, "w") as f:
+        f.write(version)
+    os.replace(latest_tmp, os.path.join(registry_dir, "LATEST"))
+    print(f"💾 Registry version {version}: {len(entries)} models ({len(failed)} failed) in {version_dir}")
+    return version
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the seasonal rainfall models.")
+    parser.add_argument("--zones", action="store_true", help="Also train one model per zone into the model registry")
+    parser.add_argument("--workers", type=int, default=None, help="Training processes (default: all cores)")
+    parser.add_argument("--source", choices=sorted(SOURCES), default="history",
+                        help="history = synthetic series, observed = readings exported from Postgres")
+    parser.add_argument("--allow-partial", action="store_true",
+                        help="Publish the registry version even if some zones failed to train")
+    args = parser.parse_args()
+
+    store = SOURCES[args.source]
+    train(store)
+    if args.zones:
+        train_zones(store, workers=args.workers, allow_partial=args.allow_partial)
+
 if __name__ == "__main__":
-    train()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,48 @@
+# tests/test_forest.py
+import os
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from backend import model_registry as registry_module
+from backend.forest import Forest, export_forest
+from backend.forecast import ForecastTable, build_forecast_table
+from backend.model_registry import ModelRegistry
+
+def _model(seed=0):
+    rng = np.random.default_rng(seed)
+    X = np.arange(1, 367, dtype=np.float32).reshape(-1, 1)
+    y = 10 * np.sin(X.ravel() / 58.0) + rng.normal(0, 1, X.shape[0])
+    return RandomForestRegressor(n_estimators=10, random_state=seed).fit(X, y)
+
+def test_forest_matches_scikit_learn(tmp_path):
+    model = _model()
+    path = export_forest(model, str(tmp_path / "m.forest"))
+    X = np.arange(1, 367, dtype=np.float32).reshape(-1, 1)
+    np.testing.assert_allclose(Forest.load(path).predict(X), model.predict(X))
+
+def test_table_built_from_forest_when_file_missing(tmp_path):
+    model = _model()
+    forest = Forest.load(export_forest(model, str(tmp_path / "m.forest")))
+    table = ForecastTable(str(tmp_path / "missing.npz"), model_loader=lambda: forest)
+    result = table.forecast(30)
+    assert len(result["date"]) == 30
+    np.testing.assert_allclose(table._current()["mean"], build_forecast_table(model)["mean"], rtol=1e-5)
+
+def test_national_forest_reloads_after_retrain(tmp_path, monkeypatch):
+    path = str(tmp_path / "seasonal_model.forest")
+    monkeypatch.setattr(registry_module, "NATIONAL_FOREST_PATH", path)
+    registry = ModelRegistry(root=str(tmp_path / "registry"))
+    assert registry.get_model() is None
+
+    export_forest(_model(0), path)
+    first = registry.get_model()
+    assert registry.get_model() is first
+
+    new_model = _model(1)
+    export_forest(new_model, path)
+    # Make sure the swap is visible even on filesystems with coarse mtimes
+    meta = os.path.join(path, "meta.json")
+    os.utime(meta, (os.path.getatime(meta), os.path.getmtime(meta) + 10))
+    second = registry.get_model()
+    assert second is not first
+    X = np.arange(1, 367, dtype=np.float32).reshape(-1, 1)
+    np.testing.assert_allclose(second.predict(X), new_model.predict(X))
@@ -0,0 +1,28 @@
+# tests/test_history_store.py
+import os
+import datetime
+import pyarrow as pa
+from backend.history_store import HistoryStore, RAW_SCHEMA
+
+def _readings(zone, start, hours):
+    timestamps = [start + datetime.timedelta(hours=h) for h in range(hours)]
+    return pa.table({
+        "zone": [zone] * hours, "year": [t.year for t in timestamps], "timestamp": timestamps,
+        "temperature": [25.0] * hours, "rainfall_1h": [0.5] * hours, "humidity": [60.0] * hours,
+        "lat": [-1.0] * hours, "lon": [36.0] * hours,
+    })
+
+def test_compact_merges_small_exports(tmp_path):
+    store = HistoryStore(str(tmp_path), RAW_SCHEMA, time_column="timestamp")
+    start = datetime.datetime(2026, 3, 1, tzinfo=datetime.timezone.utc)
+    for run in range(4):
+        store.write(_readings("Kibera (Soweto)", start + datetime.timedelta(hours=3 * run), 3), f"export-{run}")
+
+    assert store.compact(["Kibera (Soweto)"], max_files=5) == 0
+    assert store.compact(["Kibera (Soweto)"], max_files=2) == 1
+
+    files = os.listdir(store.zone_path("Kibera (Soweto)"))
+    assert len(files) == 1 and files[0].startswith("compact-")
+    df = store.read(zones=["Kibera (Soweto)"])
+    assert len(df) == 12
+    assert df["timestamp"].is_monotonic_increasing
@@ -0,0 +1,49 @@
+# tests/test_media.py
+import pytest
+from backend import media
+from backend.media import MediaTooLarge, download_media
+
+class FakeResponse:
+    """Streams fixed-size chunks and records how many were pulled."""
+
+    def __init__(self, chunks, chunk_size, headers=None):
+        self.chunks = chunks
+        self.chunk_size = chunk_size
+        self.headers = headers or {}
+        self.pulled = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for _ in range(self.chunks):
+            self.pulled += 1
+            yield b"x" * self.chunk_size
+
+def _serve(monkeypatch, resp):
+    monkeypatch.setattr(media, "_http", type("Session", (), {"get": lambda self, *a, **kw: resp})())
+
+def test_download_stops_once_past_the_limit(monkeypatch):
+    # No Content-Length: the cap has to be enforced while streaming
+    resp = FakeResponse(chunks=100, chunk_size=1000)
+    _serve(monkeypatch, resp)
+    with pytest.raises(MediaTooLarge):
+        download_media("https://example.com/photo.jpg", max_bytes=2500)
+    assert resp.pulled == 3
+
+def test_download_rejects_a_declared_oversize_file(monkeypatch):
+    resp = FakeResponse(chunks=100, chunk_size=1000, headers={"Content-Length": "100000"})
+    _serve(monkeypatch, resp)
+    with pytest.raises(MediaTooLarge):
+        download_media("https://example.com/photo.jpg", max_bytes=2500)
+    assert resp.pulled == 0
+
+def test_download_under_the_limit(monkeypatch):
+    _serve(monkeypatch, FakeResponse(chunks=2, chunk_size=1000))
+    assert len(download_media("https://example.com/photo.jpg", max_bytes=2500)) == 2000
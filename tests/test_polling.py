@@ -0,0 +1,35 @@
+# tests/test_polling.py
+import datetime
+from backend import polling
+from backend.polling import AdaptivePoller, TokenBucket
+
+def test_bucket_can_spend_a_full_tick_of_budget():
+    bucket = TokenBucket(rate_per_min=30, capacity=30 * 5)
+    bucket.tokens = 0
+    bucket.updated -= 5 * 60   # One 5-minute tick later
+    assert bucket.take(1000) == 150
+
+def test_full_scan_is_charged_to_the_bucket(monkeypatch):
+    zones = [
+        {"name": f"Zone {i}", "risk_level": level, "lat": -1.0 + i, "lon": 36.0 + i}
+        for i, level in enumerate(["Low", "Critical", "High"])
+    ]
+    scanned = []
+
+    def fake_run_scan(chosen):
+        scanned.extend(z["name"] for z in chosen)
+        return [{"city": z["name"], "rainfall_1h": 0.0} for z in chosen]
+
+    monkeypatch.setattr(polling.zone_registry, "zones", lambda: zones)
+    monkeypatch.setattr(polling, "run_scan", fake_run_scan)
+
+    bucket = TokenBucket(rate_per_min=0, capacity=2)
+    poller = AdaptivePoller(bucket)
+    now = datetime.datetime(2026, 4, 1, 12, 0)
+    poller.full_scan(now)
+
+    # Budget for two calls: the most urgent zones go first, the last one stays due
+    assert scanned == ["Zone 1", "Zone 2"]
+    assert bucket.tokens == 0
+    assert poller.next_due["Zone 0"] == now
+    assert poller.next_due["Zone 1"] > now
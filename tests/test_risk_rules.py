@@ -0,0 +1,21 @@
+# tests/test_risk_rules.py
+import datetime
+from backend.conditions_cache import ConditionsSnapshot, Conditions
+from backend.risk_rules import classify_snapshot, zone_status, NORMAL
+
+def _snapshot(records, alert_states=None):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return ConditionsSnapshot({r[0]: Conditions(*r, 0.0, 0.0, now) for r in records}, alert_states)
+
+def test_empty_snapshot_classifies_to_nothing():
+    # First scan of a fresh database: no readings at all
+    snapshot = _snapshot([])
+    assert classify_snapshot(snapshot).empty
+    assert zone_status("Nairobi", snapshot) == dict(NORMAL)
+
+def test_hysteresis_uses_persisted_state(monkeypatch):
+    monkeypatch.setattr("backend.risk_rules.zone_registry.get", lambda name: {"disaster_type": "Flood"})
+    # 7 mm/h is below the flood trigger (10) but above its hold level (6)
+    snapshot = _snapshot([("A", 25.0, 7.0, 80.0), ("B", 25.0, 7.0, 80.0)], alert_states={"A": "flood"})
+    assert zone_status("A", snapshot)["status"] == "flood"
+    assert zone_status("B", snapshot)["status"] == "normal"
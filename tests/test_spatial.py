@@ -0,0 +1,33 @@
+# tests/test_spatial.py
+import contextlib
+import shapely
+from shapely import STRtree
+from backend import spatial
+from backend.spatial import ZoneIndex
+
+ZONE = {"id": 1, "name": "Mathare", "county": "Nairobi", "risk_level": "Critical", "disaster_type": "Flood"}
+
+def test_falls_back_to_postgis_until_the_tree_is_loaded(monkeypatch):
+    monkeypatch.setattr(spatial.zone_registry, "zones", lambda: [])
+    monkeypatch.setattr(spatial.zone_registry, "version", 1)
+    monkeypatch.setattr(spatial, "SessionLocal", lambda: contextlib.nullcontext())
+    monkeypatch.setattr(spatial, "find_zones_db", lambda db, lat, lon: [{**ZONE, "match": "inside", "distance_km": 0.0}])
+
+    index = ZoneIndex()
+
+    def fake_load(db=None, version=None):
+        index._zones, index._tree, index._version = [ZONE], STRtree([shapely.box(36.8, -1.3, 36.9, -1.2)]), version
+
+    loads = []
+    monkeypatch.setattr(index, "_load_in_background", lambda: loads.append(1))
+    assert index.find_zones(-1.25, 36.85)[0]["name"] == "Mathare"
+    assert loads == [1]
+
+    fake_load(version=1)
+    assert index.find_zones(-1.25, 36.85) == [{**ZONE, "match": "inside", "distance_km": 0.0}]
+    assert loads == [1]
+
+    # Zones changed: the stale tree is not trusted, PostGIS answers while it rebuilds
+    monkeypatch.setattr(spatial.zone_registry, "version", 2)
+    index.find_zones(-1.25, 36.85)
+    assert loads == [1, 1]
@@ -0,0 +1,67 @@
+# tests/test_vision.py
+from io import BytesIO
+from types import SimpleNamespace
+from PIL import Image
+from backend import vision, whatsapp_service
+from backend.media import _preprocess
+from backend.messaging import StubSender, set_sender
+from backend.vision import AnalysisCache, FakeVisionModel, set_vision_model
+
+def _photo(side=400, quality=90):
+    """A gradient 'photo' as JPEG bytes (enough structure for the dhash to be stable)."""
+    image = Image.linear_gradient("L").resize((side, side)).convert("RGB")
+    out = BytesIO()
+    image.save(out, format="JPEG", quality=quality)
+    return out.getvalue()
+
+def test_photo_reply_goes_through_the_fake_and_the_cache(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(vision, "time", SimpleNamespace(monotonic=lambda: clock[0]))
+    monkeypatch.setattr(vision, "analysis_cache", AnalysisCache(max_entries=8, ttl=60))
+
+    photos = {"original": _photo(), "forwarded": _photo(side=320, quality=60)}
+    monkeypatch.setattr(whatsapp_service, "download_media", lambda url, auth=None: photos[url])
+    # Same work as the process pool, done inline
+    monkeypatch.setattr(whatsapp_service, "preprocess_image", lambda data: _preprocess(data, 256, 85))
+
+    model, sender = FakeVisionModel(verdict="⚠️ Flooded road"), StubSender()
+    set_vision_model(model)
+    set_sender(sender)
+    try:
+        whatsapp_service._analyze_and_reply("original", "whatsapp:+254700000001")
+        # A re-compressed, resized copy lands on (or next to) the same hash: answered without the model
+        whatsapp_service._analyze_and_reply("forwarded", "whatsapp:+254700000002")
+        assert model.calls == 1
+        stats = vision.analysis_cache.stats()
+        assert stats["hits"] + stats["near_hits"] == 1
+
+        # Past the TTL the verdict is gone and the model is asked again
+        clock[0] += 61
+        whatsapp_service._analyze_and_reply("original", "whatsapp:+254700000001")
+        assert model.calls == 2
+    finally:
+        set_vision_model(None)
+        set_sender(None)
+
+    assert [to for to, _ in sender.sent] == ["whatsapp:+254700000001", "whatsapp:+254700000002", "whatsapp:+254700000001"]
+    assert all(body == "🤖 *GeoGuard Vision*\n\n⚠️ Flooded road" for _, body in sender.sent)
+
+def test_cache_evicts_least_recently_used():
+    cache = AnalysisCache(max_entries=2, ttl=60, max_distance=0)
+    cache.put(0x0, "a")
+    cache.put(0xFF, "b")
+    assert cache.get(0x0) == "a"     # 'b' is now the oldest
+    cache.put(0xFF00, "c")
+    assert cache.get(0xFF) is None
+    assert cache.get(0x0) == "a" and cache.get(0xFF00) == "c"
+
+def test_cache_drops_expired_entries(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(vision, "time", SimpleNamespace(monotonic=lambda: clock[0]))
+    cache = AnalysisCache(max_entries=8, ttl=60)
+    cache.put(0x0, "a")
+    clock[0] = 59
+    assert cache.get(0x0) == "a"
+    clock[0] = 60
+    assert cache.get(0x0) is None
+    assert cache.stats()["entries"] == 0